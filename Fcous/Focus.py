@@ -1,19 +1,41 @@
+import time
+
+STARTUP_T0 = time.perf_counter()  # 放在最前面，启动日志里的 imports 阶段从这里算起
+
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-import json
 import os
 import sys
 import datetime
-import calendar
+import threading
+
+from focus_canvas_list import CanvasTaskList
+from focus_index import SearchIndex
+from focus_instance import send_to_running, start_or_forward
+from focus_model import (CONFIG_FILE_NAME, DATA_FOLDER_NAME, TaskModel, convert_store, fallback_data_dir,
+                         find_app_root, find_config_dir, open_archive, open_recurrence, open_store, read_config)
+from focus_perf import HEARTBEAT_MS, PROFILE_ENV, HotPathProfiler
+from focus_recur import REPEAT_MARK, parse_repeat
+from focus_storage import BackgroundWriter, write_json_atomic
+from focus_style import StyleRegistry
 
 # --- 常量定义 ---
-DATA_FOLDER_NAME = "data"
-CONFIG_FILE_NAME = "todo_config.json"
-DATA_FILE_NAME = "todo_data.json"
 DEFAULT_FONT_SIZE = 14
 DEFAULT_OPACITY = 0.98
 INIT_W, INIT_H = 400, 500
 MIN_WIDTH, MIN_HEIGHT = 350, 450
+VIRTUAL_THRESHOLD = 200  # 当天任务超过这个数量时改用虚拟列表，只创建可见的几行
+SEARCH_LIMIT = 50
+PERM_MARKER = ".perm_ok"  # 数据目录写入探测通过后留下的标记，之后启动不再重复探测
+STARTUP_LOG_NAME = "startup_timing.log"
+STARTUP_LOG_KEEP = 200  # 启动日志只保留最近这么多次，旧的随写随删
+INSTANCE_POLL_MS = 150  # 常驻实例检查外部命令的间隔
+ARCHIVE_DAYS = 90  # 完成超过这么多天的任务移进归档，0 表示不归档
+ARCHIVE_DELAY_MS = 3000  # 启动后等界面空闲下来再做归档
+FRAME_MS = 16  # 拖动、缩放窗口时每帧最多改一次位置/大小
+# 任务行控件的 bindtags：事件处理在类级别只绑定一次，建行时只挂上标签
+ROW_HOVER_TAG = "FocusTaskRow"  # 整行悬停高亮
+ROW_TOGGLE_TAG = "FocusTaskToggle"  # 点文字或复选框切换完成
+ROW_DELETE_TAG = "FocusTaskDelete"  # 点 × 删除
 
 # --- 配色系统 ---
 THEMES = {
@@ -39,50 +61,68 @@ THEMES = {
 
 
 class ModernTodoApp:
-    def __init__(self, root):
+    def __init__(self, root, data_dir=None):
         self.root = root
         self.root.title("Focus")
 
+        # 启动分阶段计时，首屏和数据都就绪后写进 startup_timing.log
+        self.startup_phases = [("imports", (time.perf_counter() - STARTUP_T0) * 1000)]
+        self.phase_t = time.perf_counter()
+        self.ready = False
+
         # 窗口状态
         self.settings_win = None
         self.calendar_win = None
+        self.search_win = None
 
-        # --- [核心修复] 终极路径判定逻辑 ---
-        # 1. 尝试获取 Nuitka/PyInstaller 的原始路径
-        if getattr(sys, 'frozen', False):
-            # Nuitka/PyInstaller 打包环境
-            # 优先尝试 sys.argv[0]，因为它通常指向启动的 .exe 全路径
-            self.app_root_path = os.path.dirname(os.path.abspath(sys.argv[0]))
-        else:
-            # 开发环境
-            self.app_root_path = os.path.dirname(os.path.abspath(__file__))
+        # 拖动/缩放：鼠标事件只记下最新的目标几何，每帧由 flush_geometry 应用一次
+        self.pending_geometry = None
+        self.geometry_job = None
+        self.resizing = False
+        self.pending_list_size = None  # 缩放过程中列表区的最新尺寸，松手后才重排
+
+        # 重绘调度：各处只标记脏区域，同一轮事件循环结束时由 paint_dirty 每块只画一次
+        self.dirty = set()
+        self.paint_job = None
+
+        # 搜索索引第一次打开搜索框时才在后台建立；本次运行改动过的日期记下来，建完后补上
+        self.search_index = None
+        self.search_building = False
+        self.search_dirty_days = set()
+
+        # 自动归档在后台线程里读写磁盘，运行期间为该线程
+        self.archive_worker = None
+
+        # 单实例监听端口，由启动入口挂上；基准测试等直接构造时为 None
+        self.instance = None
 
-        # [调试功能] 如果发现路径不对（比如是在 Temp 文件夹），启用备用方案
-        # 很多时候 Temp 文件夹路径包含 "AppData" 或 "Temp"
-        if "AppData" in self.app_root_path or "Temp" in self.app_root_path:
-            # 备用方案：尝试使用当前工作目录 (CWD)
-            # 当你双击 exe 时，CWD 通常就是 exe 所在的目录
-            self.app_root_path = os.getcwd()
+        # 所有写盘都交给后台线程合并执行，Tk 主循环不碰磁盘
+        self.writer = BackgroundWriter()
 
-        # 定义数据文件夹
-        self.default_data_dir = os.path.join(self.app_root_path, DATA_FOLDER_NAME)
+        # 软件所在目录（兼容 Nuitka/PyInstaller 打包后的路径）
+        self.app_root_path = find_app_root()
+
+        # 定义数据文件夹（基准测试等场景可以直接指定）
+        self.default_data_dir = data_dir or os.path.join(self.app_root_path, DATA_FOLDER_NAME)
 
         # 尝试创建文件夹，如果权限不足（例如在 C 盘根目录），则回退到用户文档目录
+        # 探测结果用标记文件缓存：标记在就说明以前写入成功过，只需一次 stat
         try:
-            if not os.path.exists(self.default_data_dir):
-                os.makedirs(self.default_data_dir)
-            # 测试写入权限
-            test_file = os.path.join(self.default_data_dir, ".perm_test")
-            with open(test_file, 'w') as f:
-                f.write("test")
-            os.remove(test_file)
+            marker = os.path.join(self.default_data_dir, PERM_MARKER)
+            if not os.path.exists(marker):
+                if not os.path.exists(self.default_data_dir):
+                    os.makedirs(self.default_data_dir)
+                # 测试写入权限
+                with open(marker, 'w') as f:
+                    f.write("ok")
         except Exception as e:
             # 权限不足，回退到【我的文档/Focus_Data】目录
-            user_docs = os.path.join(os.path.expanduser("~"), "Documents", "Focus_Data")
+            user_docs = fallback_data_dir()
             if not os.path.exists(user_docs):
                 os.makedirs(user_docs)
             self.default_data_dir = user_docs
             # 此时弹窗提示用户（仅第一次）
+            from tkinter import messagebox
             messagebox.showwarning("路径权限提示",
                                    f"软件所在的目录无法写入数据。\n数据将保存到：\n{self.default_data_dir}")
 
@@ -98,7 +138,8 @@ class ModernTodoApp:
             self.data_dir = self.default_data_dir
             self.save_config()
 
-        self.data_file_path = os.path.join(self.data_dir, DATA_FILE_NAME)
+        self.storage_backend = self.config.get("storage", "json")
+        self.mark_phase("config")
 
         # --- [调试弹窗] ---
         # 编译完成后，如果是第一次运行不确定路径，可以保留这几行
@@ -112,9 +153,12 @@ class ModernTodoApp:
         self.is_topmost = self.config.get("is_topmost", False)
         self.theme_mode = self.config.get("theme", "dark")
         self.opacity = self.config.get("opacity", DEFAULT_OPACITY)
+        self.virtual_threshold = self.config.get("virtual_threshold", VIRTUAL_THRESHOLD)
+        self.list_engine = self.config.get("list_engine", "widgets")
+        self.resident = self.config.get("resident", False)  # 关闭按钮只隐藏窗口，数据常驻内存
+        self.archive_days = self.config.get("archive_days", ARCHIVE_DAYS)
 
         self.current_date = datetime.date.today()
-        self.tasks_data = self.load_tasks_data()
 
         # 初始化窗口
         self.root.geometry(f"{INIT_W}x{INIT_H}+1400+100")
@@ -131,9 +175,125 @@ class ModernTodoApp:
         except:
             pass
 
-        self.update_fonts()
-        self.setup_ui()
+        # 性能采样模式：必须在 setup_ui 绑定事件之前把热点方法换成计时版本
+        self.profiler = None
+        self.perf_overlay = None
+        if os.environ.get(PROFILE_ENV) or self.config.get("profile"):
+            self.install_profiler()
+
+        self.style = StyleRegistry(self.root, self.colors, self.font_size)
+        self.bind_fonts()
+        self.bind_row_events()
+        self.setup_ui(staged=True)
+        self.update_date_display()
+        self.mark_phase("window")
+
+        # 先把标题栏、日期和输入框画出来，打开存储、读数据、建列表区都放到首帧之后
+        self.root.update()
+        self.mark_phase("first_paint")
+        self.root.after_idle(self.finish_startup)
+
+    # --- 分阶段启动 ---
+    def mark_phase(self, name):
+        now = time.perf_counter()
+        self.startup_phases.append((name, (now - self.phase_t) * 1000))
+        self.phase_t = now
+
+    def finish_startup(self):
+        self.model = self.load_model()
+        if self.model is None:
+            self.exit_on_data_error()
+            return
+        self.cal_grid_cache = {}
+        self.mark_phase("data")
+        self.setup_list_ui()
+        self.ready = True
         self.render_tasks()
+        self.mark_phase("render")
+        self.write_startup_log()
+        self.root.after(ARCHIVE_DELAY_MS, self.run_archive)
+
+    def run_archive(self):
+        if not self.archive_days or self.archive_worker is not None:
+            return
+        cutoff = (datetime.date.today() - datetime.timedelta(days=self.archive_days)).strftime("%Y-%m-%d")
+        model, job, result = self.model, self.model.archive_job(cutoff), {}
+
+        def work():
+            result['kept'], result['moved'] = job()
+
+        self.archive_worker = threading.Thread(target=work, daemon=True)
+        self.archive_worker.start()
+
+        def poll():
+            if self.archive_worker.is_alive():
+                self.root.after(100, poll)
+                return
+            self.archive_worker = None
+            if not result.get('moved') or model is not self.model:
+                return
+            self.model.finish_archive(result['kept'])
+            self.cal_grid_cache = {}
+            self.invalidate("list", "calendar")
+
+        self.root.after(100, poll)
+
+    def wait_archive(self):
+        # 关闭或换存储前等归档线程做完，免得归档写了一半、在用数据还没删
+        if self.archive_worker is not None:
+            self.archive_worker.join()
+
+    def write_startup_log(self):
+        total = (time.perf_counter() - STARTUP_T0) * 1000
+        line = " | ".join(f"{name} {ms:.1f}ms" for name, ms in self.startup_phases)
+        line = f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S}  {line} | total {total:.1f}ms\n"
+        log_path = os.path.join(self.data_dir, STARTUP_LOG_NAME)
+
+        def append():
+            try:
+                with open(log_path, 'r', encoding='utf-8') as f:
+                    lines = f.readlines()[-(STARTUP_LOG_KEEP - 1):]
+            except (OSError, ValueError):  # 读不出（包括乱码）就从头记
+                lines = []
+            with open(log_path, 'w', encoding='utf-8') as f:
+                f.writelines(lines + [line])
+
+        self.writer.submit("startup_log", append)
+
+    # --- 性能采样 ---
+    def install_profiler(self):
+        self.profiler = HotPathProfiler()
+        # 原先每次点击都会调用的 save_tasks_data 已拆成增量写入，这里以增删改三个入口代替
+        for name in ("render_tasks", "paint_dirty", "save_config", "add_task", "toggle_task", "delete_task",
+                     "do_move", "do_resize"):
+            setattr(self, name, self.profiler.wrap(name, getattr(self, name)))
+        self.root.bind("<F12>", self.toggle_cprofile)
+        self._heartbeat_at = None
+        self._heartbeat_count = 0
+        self.root.after(HEARTBEAT_MS, self.perf_heartbeat)
+
+    def perf_heartbeat(self):
+        # 定时器实际到达的延迟就是主循环被卡住的时长
+        now = time.perf_counter()
+        if self._heartbeat_at is not None:
+            self.profiler.record("loop_lag", max(0.0, (now - self._heartbeat_at) * 1000 - HEARTBEAT_MS))
+        self._heartbeat_at = now
+        self._heartbeat_count += 1
+        # 浮层每 10 次心跳刷新一次，避免采样本身成为负担
+        if self._heartbeat_count % 10 == 0 and self.perf_overlay is not None and self.perf_overlay.winfo_exists():
+            self.perf_overlay.config(text="\n".join(self.profiler.report_lines()) or "采样中…")
+        self.root.after(HEARTBEAT_MS, self.perf_heartbeat)
+
+    def show_perf_overlay(self):
+        self.perf_overlay = self.style.paint(tk.Label(self.root, text="采样中…", font=("Consolas", 8), justify='left',
+                                                      anchor='w'), bg='input_bg', fg='sub_text')
+        self.perf_overlay.place(x=4, rely=1.0, y=-4, anchor="sw")
+
+    def toggle_cprofile(self, event=None):
+        path = os.path.join(self.data_dir, datetime.datetime.now().strftime("focus_profile_%Y%m%d_%H%M%S.pstats"))
+        dumped = self.profiler.toggle_cprofile(path)
+        if self.perf_overlay is not None:
+            self.style.paint(self.perf_overlay, fg='sub_text' if dumped else 'accent')
 
     # --- 核心配置 ---
     def load_config(self):
@@ -142,15 +302,16 @@ class ModernTodoApp:
             "is_topmost": False,
             "theme": "dark",
             "opacity": DEFAULT_OPACITY,
-            "data_dir": self.default_data_dir
+            "data_dir": self.default_data_dir,
+            "storage": "json",
+            "virtual_threshold": VIRTUAL_THRESHOLD,
+            "list_engine": "widgets",
+            "resident": False,
+            "archive_days": ARCHIVE_DAYS
         }
-        if os.path.exists(self.config_path):
-            try:
-                with open(self.config_path, "r", encoding="utf-8") as f:
-                    loaded = json.load(f)
-                    default_config.update(loaded)
-            except:
-                pass
+        loaded = read_config(self.config_path)  # 带校验和，损坏时退回上一版
+        if loaded:
+            default_config.update(loaded)
         return default_config
 
     def save_config(self):
@@ -159,105 +320,112 @@ class ModernTodoApp:
             "is_topmost": self.is_topmost,
             "theme": self.theme_mode,
             "opacity": self.opacity,
-            "data_dir": self.data_dir
+            "data_dir": self.data_dir,
+            "storage": self.storage_backend,
+            "list_engine": self.list_engine,
+            "resident": self.resident,
+            "archive_days": self.archive_days
         })
-        try:
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=2)
-        except:
-            pass
+        # 拖动透明度滑块时每帧都会调用这里，交给写线程后只有最后一份会落盘
+        path, data = self.config_path, dict(self.config)
+        self.writer.submit("config", lambda: write_json_atomic(path, data))
 
-    def load_tasks_data(self):
-        if os.path.exists(self.data_file_path):
-            try:
-                with open(self.data_file_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
+    def open_store(self):
+        return open_store(self.data_dir, self.storage_backend, writer=self.writer)
 
-    def save_tasks_data(self):
+    def load_model(self):
+        # 任务数据层与界面无关，命令行也用同一个 TaskModel
         try:
-            with open(self.data_file_path, "w", encoding="utf-8") as f:
-                json.dump(self.tasks_data, f, ensure_ascii=False, indent=2)
-        except:
-            pass
-
-    def update_fonts(self):
-        self.font_main = ("Segoe UI", self.font_size)
-        self.font_bold = ("Segoe UI", self.font_size, "bold")
-        self.font_title = ("Segoe UI", self.font_size + 8, "bold")
+            model = TaskModel(self.open_store(), open_recurrence(self.data_dir, writer=self.writer),
+                              open_archive(self.data_dir))
+            model.load_window(self.current_date)
+        except ValueError as e:
+            # 数据文件连同备份都读不出来：不能拿空数据顶上，之后的写盘会把残片彻底覆盖掉
+            from tkinter import messagebox
+            messagebox.showerror("数据文件损坏", f"{e}\n\n原文件都已原样保留，请从备份恢复后再打开 Focus。")
+            return None
+        except OSError as e:
+            # 文件暂时打不开（被其他程序锁住等），不是损坏：什么都不改，稍后重新打开即可
+            from tkinter import messagebox
+            messagebox.showerror("数据文件无法读取", f"{e}\n\n文件可能正被其他程序占用，请稍后重新打开 Focus。")
+            return None
+        return model
+
+    def bind_fonts(self):
+        # 都是 style 里共享的 Font 对象，改字号时由 style.set_font_size 统一调整，这里只赋值一次
+        fonts = self.style.fonts
+        self.font_main, self.font_bold, self.font_title = fonts['main'], fonts['bold'], fonts['title']
         self.font_icon = ("Arial", 16)
-        self.font_ui_small = ("Segoe UI", int(self.font_size * 0.85))
-        self.font_ui_bold = ("Segoe UI", int(self.font_size * 0.85), "bold")
-        self.font_cal_header = ("Segoe UI", int(self.font_size * 0.8), "bold")
-        self.font_cal_weekday = ("Segoe UI", int(self.font_size * 0.65))
-        self.font_cal_day = ("Segoe UI", int(self.font_size * 0.65))
-        self.font_cal_day_bold = ("Segoe UI", int(self.font_size * 0.65), "bold")
+        self.font_ui_small, self.font_ui_bold, self.font_path = fonts['ui_small'], fonts['ui_bold'], fonts['path']
+        self.font_cal_header, self.font_cal_weekday = fonts['cal_header'], fonts['cal_weekday']
+        self.font_cal_day, self.font_cal_day_bold = fonts['cal_day'], fonts['cal_day_bold']
 
     # --- 自定义复选框 ---
-    def create_checkbox(self, parent, checked=False, size=22, command=None):
+    def create_checkbox(self, parent, checked=False, size=22, tag=ROW_TOGGLE_TAG):
+        # 点击由 tag 对应的类级别绑定处理，复选框自己不翻转
         canvas = tk.Canvas(parent, width=size, height=size,
                            bg=self.colors['bg'], highlightthickness=0, cursor="hand2")
         canvas.checked = checked
-        canvas.command = command
         canvas.size = size
         self._draw_checkbox(canvas)
-        canvas.bind("<Button-1>", lambda e: self._toggle_checkbox(canvas))
+        self.add_bindtags(canvas, tag)
         return canvas
 
+    def add_bindtags(self, widget, *tags):
+        # 插在控件自身之后、控件类之前，事件先走这些共用的类级别绑定
+        own, *rest = widget.bindtags()
+        widget.bindtags((own, *tags, *rest))
+
     def _draw_checkbox(self, canvas):
         canvas.delete("all")
-        size = canvas.size
+        self.draw_checkbox_items(canvas, 0, 0, canvas.size, canvas.checked)
+
+    def draw_checkbox_items(self, canvas, x, y, size, checked, tags=()):
+        # 复选框图形画在 (x, y) 处，画布列表直接复用这套图元
         padding = 2
         border_width = 2
-        if canvas.checked:
-            canvas.create_rectangle(padding, padding, size - padding, size - padding,
-                                    fill=self.colors['checkbox_fill'], outline=self.colors['checkbox_fill'], width=0)
+        if checked:
+            canvas.create_rectangle(x + padding, y + padding, x + size - padding, y + size - padding,
+                                    fill=self.colors['checkbox_fill'], outline=self.colors['checkbox_fill'], width=0,
+                                    tags=tags)
             check_color = "#FFFFFF"
-            x1, y1 = size * 0.22, size * 0.5
-            x2, y2 = size * 0.42, size * 0.72
-            x3, y3 = size * 0.78, size * 0.28
-            canvas.create_line(x1, y1, x2, y2, fill=check_color, width=2, capstyle='round')
-            canvas.create_line(x2, y2, x3, y3, fill=check_color, width=2, capstyle='round')
+            x1, y1 = x + size * 0.22, y + size * 0.5
+            x2, y2 = x + size * 0.42, y + size * 0.72
+            x3, y3 = x + size * 0.78, y + size * 0.28
+            canvas.create_line(x1, y1, x2, y2, fill=check_color, width=2, capstyle='round', tags=tags)
+            canvas.create_line(x2, y2, x3, y3, fill=check_color, width=2, capstyle='round', tags=tags)
         else:
-            canvas.create_rectangle(padding, padding, size - padding, size - padding,
-                                    fill="", outline=self.colors['checkbox_border'], width=border_width)
-
-    def _toggle_checkbox(self, canvas):
-        canvas.checked = not canvas.checked
-        self._draw_checkbox(canvas)
-        if canvas.command:
-            canvas.command()
+            canvas.create_rectangle(x + padding, y + padding, x + size - padding, y + size - padding,
+                                    fill="", outline=self.colors['checkbox_border'], width=border_width, tags=tags)
 
     # --- UI 构建 ---
-    def setup_ui(self):
+    # 颜色都通过 self.style.paint 按角色登记，换主题时由 apply_theme 就地改色，不再重建界面
+    def setup_ui(self, staged=False):
         self.colors = THEMES[self.theme_mode]
-        self.root.configure(bg=self.colors['bg'])
+        self.style.paint(self.root, bg='bg')
         for widget in self.root.winfo_children():
             widget.destroy()
+        paint = self.style.paint
 
-        self.main_container = tk.Frame(self.root, bg=self.colors['bg'],
-                                       highlightthickness=1, highlightbackground=self.colors['border'])
+        self.main_container = paint(tk.Frame(self.root, highlightthickness=1), bg='bg', highlightbackground='border')
         self.main_container.pack(fill='both', expand=True)
 
-        self.title_bar = tk.Frame(self.main_container, bg=self.colors['bg'], height=40)
+        self.title_bar = paint(tk.Frame(self.main_container, height=40), bg='bg')
         self.title_bar.pack(fill='x', pady=(10, 0), padx=20)
         self.title_bar.bind("<ButtonPress-1>", self.start_move)
         self.title_bar.bind("<B1-Motion>", self.do_move)
 
-        app_title = tk.Label(self.title_bar, text="Focus.", font=("Segoe UI", 12, "bold"), fg=self.colors['sub_text'],
-                             bg=self.colors['bg'])
+        app_title = paint(tk.Label(self.title_bar, text="Focus.", font=("Segoe UI", 12, "bold")), fg='sub_text', bg='bg')
         app_title.pack(side='left')
         app_title.bind("<ButtonPress-1>", self.start_move)
         app_title.bind("<B1-Motion>", self.do_move)
 
-        btn_frame = tk.Frame(self.title_bar, bg=self.colors['bg'])
+        btn_frame = paint(tk.Frame(self.title_bar), bg='bg')
         btn_frame.pack(side='right')
 
         def create_icon_btn(text, cmd, tooltip):
-            color = self.colors['accent'] if (text == "📌" and self.is_topmost) else self.colors['sub_text']
-            btn = tk.Label(btn_frame, text=text, fg=color, bg=self.colors['bg'], font=self.font_icon, cursor="hand2")
+            color = 'accent' if (text == "📌" and self.is_topmost) else 'sub_text'
+            btn = paint(tk.Label(btn_frame, text=text, font=self.font_icon, cursor="hand2"), fg=color, bg='bg')
             btn.pack(side='left', padx=6)
             btn.bind("<Button-1>", cmd)
             btn.bind("<Enter>", lambda e: btn.config(fg=self.colors['fg']))
@@ -266,39 +434,39 @@ class ModernTodoApp:
             self.create_tooltip(btn, tooltip)
             return btn
 
+        create_icon_btn("🔍", self.open_search, "搜索任务")
         self.btn_pin = create_icon_btn("📌", self.toggle_topmost, "置顶窗口")
         create_icon_btn("⚙", self.open_settings, "偏好设置")
 
-        btn_close = tk.Label(btn_frame, text="×", fg=self.colors['sub_text'], bg=self.colors['bg'], font=("Arial", 20),
-                             cursor="hand2")
+        btn_close = paint(tk.Label(btn_frame, text="×", font=("Arial", 20), cursor="hand2"), fg='sub_text', bg='bg')
         btn_close.pack(side='left', padx=(6, 0))
-        btn_close.bind("<Button-1>", lambda e: self.save_and_exit())
+        btn_close.bind("<Button-1>", self.close_window)
         btn_close.bind("<Enter>", lambda e: btn_close.config(fg='#EF4444'))
         btn_close.bind("<Leave>", lambda e: btn_close.config(fg=self.colors['sub_text']))
 
-        header_frame = tk.Frame(self.main_container, bg=self.colors['bg'])
+        header_frame = paint(tk.Frame(self.main_container), bg='bg')
         header_frame.pack(fill='x', padx=20, pady=(15, 5))
-        nav_frame = tk.Frame(header_frame, bg=self.colors['bg'])
+        nav_frame = paint(tk.Frame(header_frame), bg='bg')
         nav_frame.pack(fill='x')
 
-        btn_prev = tk.Label(nav_frame, text="<", font=self.font_bold, fg=self.colors['sub_text'], bg=self.colors['bg'],
-                            cursor="hand2", width=3)
+        btn_prev = paint(tk.Label(nav_frame, text="<", font=self.font_bold, cursor="hand2", width=3),
+                         fg='sub_text', bg='bg')
         btn_prev.pack(side='left')
         btn_prev.bind("<Button-1>", lambda e: self.change_date(-1))
         btn_prev.bind("<Enter>", lambda e: btn_prev.config(fg=self.colors['accent']))
         btn_prev.bind("<Leave>", lambda e: btn_prev.config(fg=self.colors['sub_text']))
 
-        btn_next = tk.Label(nav_frame, text=">", font=self.font_bold, fg=self.colors['sub_text'], bg=self.colors['bg'],
-                            cursor="hand2", width=3)
+        btn_next = paint(tk.Label(nav_frame, text=">", font=self.font_bold, cursor="hand2", width=3),
+                         fg='sub_text', bg='bg')
         btn_next.pack(side='right')
         btn_next.bind("<Button-1>", lambda e: self.change_date(1))
         btn_next.bind("<Enter>", lambda e: btn_next.config(fg=self.colors['accent']))
         btn_next.bind("<Leave>", lambda e: btn_next.config(fg=self.colors['sub_text']))
 
-        date_container = tk.Frame(nav_frame, bg=self.colors['bg'])
+        date_container = paint(tk.Frame(nav_frame), bg='bg')
         date_container.pack(fill='both', expand=True)
-        self.lbl_date = tk.Label(date_container, text="", font=self.font_title, bg=self.colors['bg'],
-                                 fg=self.colors['fg'], cursor="hand2")
+        self.lbl_date = paint(tk.Label(date_container, text="", font=self.font_title, cursor="hand2"),
+                              bg='bg', fg='fg')
         self.lbl_date.pack(expand=True)
         self.lbl_date.bind("<Button-1>", self._on_date_click)
         date_container.bind("<Button-1>", self._on_date_click)
@@ -314,41 +482,81 @@ class ModernTodoApp:
         date_container.bind("<Enter>", on_date_enter)
         date_container.bind("<Leave>", on_date_leave)
 
-        self.entry_frame = tk.Frame(self.main_container, bg=self.colors['bg'])
+        self.entry_frame = paint(tk.Frame(self.main_container), bg='bg')
         self.entry_frame.pack(fill='x', padx=20, pady=15)
-        input_container = tk.Frame(self.entry_frame, bg=self.colors['input_bg'], padx=10, pady=5)
+        input_container = paint(tk.Frame(self.entry_frame, padx=10, pady=5), bg='input_bg')
         input_container.pack(fill='x')
-        self.entry = tk.Entry(input_container, font=self.font_main, bg=self.colors['input_bg'],
-                              fg=self.colors['input_fg'], bd=0, insertbackground=self.colors['fg'])
+        self.entry = paint(tk.Entry(input_container, font=self.font_main, bd=0),
+                           bg='input_bg', fg='input_fg', insertbackground='fg')
         self.entry.pack(side='left', fill='both', expand=True, pady=3)
         self.placeholder_text = "做点什么..."
         self.entry.insert(0, self.placeholder_text)
-        self.entry.config(fg=self.colors['sub_text'])
+        paint(self.entry, fg='sub_text')
         self.entry.bind("<FocusIn>", self.on_entry_focus_in)
         self.entry.bind("<FocusOut>", self.on_entry_focus_out)
         self.entry.bind("<Return>", self.add_task)
-        self.btn_add = tk.Label(input_container, text="+", bg=self.colors['accent'], fg='#FFF',
-                                font=("Arial", 16, "bold"), width=3, cursor="hand2")
+        self.btn_add = paint(tk.Label(input_container, text="+", font=("Arial", 16, "bold"), width=3, cursor="hand2"),
+                             bg='accent', fg='#FFF')
         self.btn_add.pack(side='right')
         self.btn_add.bind("<Button-1>", self.add_task)
-
-        self.canvas = tk.Canvas(self.main_container, bg=self.colors['bg'], bd=0, highlightthickness=0)
-        self.scroll_frame = tk.Frame(self.canvas, bg=self.colors['bg'])
+        self.root.bind("<Control-f>", self.open_search)
+        self.root.bind("<Control-z>", self.undo)
+        self.root.bind("<Control-y>", self.redo)
+        self.root.bind("<Control-Z>", self.redo)  # Ctrl+Shift+Z
+
+        # 冷启动时列表区留到数据加载完再建，其余情况（切换列表引擎等）一次建完
+        if not staged:
+            self.setup_list_ui()
+
+    def setup_list_ui(self):
+        self.canvas = self.style.paint(tk.Canvas(self.main_container, bd=0, highlightthickness=0), bg='bg')
+        self.scroll_frame = self.style.paint(tk.Frame(self.canvas), bg='bg')
         self.canvas.bind('<Configure>', self.on_canvas_configure)
         self.scroll_frame.bind("<Configure>", self.on_frame_configure)
         self.canvas_window = self.canvas.create_window((0, 0), window=self.scroll_frame, anchor="nw", width=INIT_W - 45)
         self.canvas.pack(side="left", fill="both", expand=True, padx=20, pady=(0, 20))
+        self.root.bind("<MouseWheel>", self.on_list_wheel)
+        self.virtual_mode = False
+        self.list_viewport_h = 0
+        # "canvas" 引擎把整张列表画成画布图元，scroll_frame 闲置不用
+        self.canvas_list = CanvasTaskList(self, self.canvas) if self.list_engine == "canvas" else None
 
-        self.grip = tk.Label(self.root, text=" ", bg=self.colors['bg'], cursor="size_nw_se")
+        self.grip = self.style.paint(tk.Label(self.root, text=" ", cursor="size_nw_se"), bg='bg')
         self.grip.place(relx=1.0, rely=1.0, anchor="se", width=15, height=15)
         self.grip.bind("<ButtonPress-1>", self.start_resize)
         self.grip.bind("<B1-Motion>", self.do_resize)
+        self.grip.bind("<ButtonRelease-1>", self.end_resize)
+
+        self.perf_overlay = None
+        if self.profiler:
+            self.show_perf_overlay()
 
     def _on_date_click(self, event=None):
-        self.open_calendar()
+        if self.ready:
+            self.open_calendar()
 
     def on_canvas_configure(self, event):
-        self.canvas.itemconfig(self.canvas_window, width=event.width)
+        if self.resizing:
+            # 拖着缩放时列表不跟着每一帧重排，松手时按最终尺寸排一次
+            self.pending_list_size = (event.width, event.height)
+            return
+        self.relayout_list(event.width, event.height)
+
+    def relayout_list(self, width, height):
+        self.canvas.itemconfig(self.canvas_window, width=width)
+        self.list_viewport_h = height
+        if self.canvas_list:
+            self.canvas_list.resize(width)
+        elif self.virtual_mode:
+            self.canvas.itemconfig(self.canvas_window, height=height)
+            self.layout_virtual_rows()
+
+    def on_list_wheel(self, event):
+        if self.virtual_mode:
+            self.virtual_top -= int(event.delta / 120) * self.virtual_row_h
+            self.layout_virtual_rows()
+        else:
+            self.canvas.yview_scroll(int(-1 * (event.delta / 120)), "units")
 
     def on_frame_configure(self, event):
         self.canvas.configure(scrollregion=self.canvas.bbox("all"))
@@ -358,36 +566,35 @@ class ModernTodoApp:
         if self.settings_win and tk.Toplevel.winfo_exists(self.settings_win):
             self.settings_win.lift()
             return
+        paint = self.style.paint
 
         self.settings_win = tk.Toplevel(self.root)
         self.settings_win.title("")
         self.settings_win.attributes('-topmost', True)
         self.settings_win.geometry("420x380")
-        self.settings_win.configure(bg=self.colors['bg'])
+        paint(self.settings_win, bg='bg')
         self.settings_win.overrideredirect(True)
 
         x = self.root.winfo_x() + (self.root.winfo_width() // 2) - 210
         y = self.root.winfo_y() + 50
         self.settings_win.geometry(f"+{x}+{y}")
 
-        tk.Frame(self.settings_win, bg=self.colors['border'], bd=1).place(x=0, y=0, relwidth=1, relheight=1)
+        paint(tk.Frame(self.settings_win, bd=1), bg='border').place(x=0, y=0, relwidth=1, relheight=1)
 
-        header = tk.Frame(self.settings_win, bg=self.colors['bg'], height=50)
+        header = paint(tk.Frame(self.settings_win, height=50), bg='bg')
         header.pack(fill='x', padx=2, pady=2)
-        title_lbl = tk.Label(header, text="偏好设置", fg=self.colors['fg'], bg=self.colors['bg'],
-                             font=self.font_ui_bold)
+        title_lbl = paint(tk.Label(header, text="偏好设置", font=self.font_ui_bold), fg='fg', bg='bg')
         title_lbl.place(relx=0.5, rely=0.5, anchor="center")
-        close_btn = tk.Label(header, text="×", fg=self.colors['sub_text'], bg=self.colors['bg'], font=("Arial", 18),
-                             cursor="hand2")
+        close_btn = paint(tk.Label(header, text="×", font=("Arial", 18), cursor="hand2"), fg='sub_text', bg='bg')
         close_btn.pack(side='right', padx=10)
         close_btn.bind("<Button-1>", lambda e: self.settings_win.destroy())
         close_btn.bind("<Enter>", lambda e: close_btn.config(fg=self.colors['fg']))
 
-        container = tk.Frame(self.settings_win, bg=self.colors['bg'])
+        container = paint(tk.Frame(self.settings_win), bg='bg')
         container.pack(fill='both', expand=True, padx=2, pady=2)
-        canvas = tk.Canvas(container, bg=self.colors['bg'], highlightthickness=0)
+        canvas = paint(tk.Canvas(container, highlightthickness=0), bg='bg')
         scrollbar = tk.Scrollbar(container, orient="vertical", command=canvas.yview)
-        scrollable_frame = tk.Frame(canvas, bg=self.colors['bg'])
+        scrollable_frame = paint(tk.Frame(canvas), bg='bg')
         scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
 
         def _on_mousewheel(event):
@@ -400,47 +607,58 @@ class ModernTodoApp:
         canvas.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
-        content = tk.Frame(scrollable_frame, bg=self.colors['bg'], padx=25, pady=10)
+        content = paint(tk.Frame(scrollable_frame, padx=25, pady=10), bg='bg')
         content.pack(fill='both', expand=True)
 
-        tk.Label(content, text="配色方案", fg=self.colors['sub_text'], bg=self.colors['bg'],
-                 font=self.font_ui_small).pack(anchor='w', pady=(15, 5))
-        theme_btn_text = "切换至 浅色模式 ☀" if self.theme_mode == "dark" else "切换至 深色模式 🌙"
-        tk.Button(content, text=theme_btn_text, command=lambda: [self.toggle_theme(), self.settings_win.destroy()],
-                  bg=self.colors['input_bg'], fg=self.colors['fg'], bd=0, font=self.font_ui_small, pady=8).pack(
-            fill='x')
+        paint(tk.Label(content, text="配色方案", font=self.font_ui_small), fg='sub_text', bg='bg').pack(
+            anchor='w', pady=(15, 5))
+
+        def theme_btn_text():
+            return "切换至 浅色模式 ☀" if self.theme_mode == "dark" else "切换至 深色模式 🌙"
+
+        def switch_theme():
+            # 设置窗口本身也在样式表里，跟着一起改色，不用关掉重开
+            self.toggle_theme()
+            theme_btn.config(text=theme_btn_text())
+            draw_slider(int(self.opacity * 100))
 
-        tk.Label(content, text="文字排版", fg=self.colors['sub_text'], bg=self.colors['bg'],
-                 font=self.font_ui_small).pack(anchor='w', pady=(20, 5))
-        f_frame = tk.Frame(content, bg=self.colors['bg'])
+        theme_btn = paint(tk.Button(content, text=theme_btn_text(), command=switch_theme, bd=0,
+                                    font=self.font_ui_small, pady=8), bg='input_bg', fg='fg')
+        theme_btn.pack(fill='x')
+
+        paint(tk.Label(content, text="文字排版", font=self.font_ui_small), fg='sub_text', bg='bg').pack(
+            anchor='w', pady=(20, 5))
+        f_frame = paint(tk.Frame(content), bg='bg')
         f_frame.pack(fill='x')
+        font_btns = {}
 
         def set_font(size):
             self.font_size = size
-            self.update_fonts()
+            self.style.set_font_size(size)
             self.save_config()
-            self.setup_ui()
-            self.render_tasks()
-            self.settings_win.destroy()
-            self.open_settings()
+            # 文字控件随共享字体自动重排；行高、复选框大小按字号计算，列表要重排一次
+            self.invalidate("list")
+            for s, btn in font_btns.items():
+                paint(btn, bg='accent' if s == size else 'input_bg', fg='#FFF' if s == size else 'fg')
 
         for size in [14, 16, 18, 20]:
-            bg_c = self.colors['accent'] if size == self.font_size else self.colors['input_bg']
-            fg_c = '#FFF' if size == self.font_size else self.colors['fg']
-            tk.Button(f_frame, text=f"{size}", command=lambda s=size: set_font(s),
-                      bg=bg_c, fg=fg_c, bd=0, width=5, font=self.font_ui_small).pack(side='left', padx=(0, 10))
-
-        tk.Label(content, text="背景透明度", fg=self.colors['sub_text'], bg=self.colors['bg'],
-                 font=self.font_ui_small).pack(anchor='w', pady=(20, 5))
-        opacity_frame = tk.Frame(content, bg=self.colors['bg'])
+            btn = tk.Button(f_frame, text=f"{size}", command=lambda s=size: set_font(s), bd=0, width=5,
+                            font=self.font_ui_small)
+            font_btns[size] = paint(btn, bg='accent' if size == self.font_size else 'input_bg',
+                                    fg='#FFF' if size == self.font_size else 'fg')
+            btn.pack(side='left', padx=(0, 10))
+
+        paint(tk.Label(content, text="背景透明度", font=self.font_ui_small), fg='sub_text', bg='bg').pack(
+            anchor='w', pady=(20, 5))
+        opacity_frame = paint(tk.Frame(content), bg='bg')
         opacity_frame.pack(fill='x')
-        self.opacity_label = tk.Label(opacity_frame, text=f"{int(self.opacity * 100)}%",
-                                      fg=self.colors['fg'], bg=self.colors['bg'], font=self.font_ui_bold, width=5)
+        self.opacity_label = paint(tk.Label(opacity_frame, text=f"{int(self.opacity * 100)}%", font=self.font_ui_bold,
+                                            width=5), fg='fg', bg='bg')
         self.opacity_label.pack(side='right')
-        slider_container = tk.Frame(opacity_frame, bg=self.colors['bg'])
+        slider_container = paint(tk.Frame(opacity_frame), bg='bg')
         slider_container.pack(side='left', fill='x', expand=True, padx=(0, 10))
-        self.opacity_canvas = tk.Canvas(slider_container, height=30, bg=self.colors['bg'], highlightthickness=0,
-                                        cursor="hand2")
+        self.opacity_canvas = paint(tk.Canvas(slider_container, height=30, highlightthickness=0, cursor="hand2"),
+                                    bg='bg')
         self.opacity_canvas.pack(fill='x', expand=True)
         self.slider_padding, self.slider_height, self.knob_radius = 10, 6, 8
 
@@ -482,28 +700,201 @@ class ModernTodoApp:
         self.opacity_canvas.bind("<Configure>", lambda e: draw_slider(int(self.opacity * 100)))
         self.root.after(10, lambda: draw_slider(int(self.opacity * 100)))
 
-        tk.Label(content, text="数据存储位置", fg=self.colors['sub_text'], bg=self.colors['bg'],
-                 font=self.font_ui_small).pack(anchor='w', pady=(20, 5))
-        path_box = tk.Frame(content, bg=self.colors['input_bg'], padx=10, pady=10)
+        paint(tk.Label(content, text="列表渲染", font=self.font_ui_small), fg='sub_text', bg='bg').pack(
+            anchor='w', pady=(20, 5))
+        e_frame = paint(tk.Frame(content), bg='bg')
+        e_frame.pack(fill='x')
+
+        def set_engine(engine):
+            self.list_engine = engine
+            self.save_config()
+            self.setup_ui()
+            self.invalidate("header", "list")
+            self.settings_win.destroy()
+            self.open_settings()
+
+        for engine, label in [("widgets", "控件"), ("canvas", "画布")]:
+            paint(tk.Button(e_frame, text=label, command=lambda e=engine: set_engine(e), bd=0, width=8,
+                            font=self.font_ui_small),
+                  bg='accent' if engine == self.list_engine else 'input_bg',
+                  fg='#FFF' if engine == self.list_engine else 'fg').pack(side='left', padx=(0, 10))
+
+        paint(tk.Label(content, text="存储引擎", font=self.font_ui_small), fg='sub_text', bg='bg').pack(
+            anchor='w', pady=(20, 5))
+        s_frame = paint(tk.Frame(content), bg='bg')
+        s_frame.pack(fill='x')
+
+        def set_storage(backend):
+            if backend != self.storage_backend and self.ready:
+                self.reopen_store(backend)
+            self.settings_win.destroy()
+            self.open_settings()
+
+        for backend, label in [("json", "JSON"), ("sqlite", "SQLite")]:
+            paint(tk.Button(s_frame, text=label, command=lambda b=backend: set_storage(b), bd=0, width=8,
+                            font=self.font_ui_small),
+                  bg='accent' if backend == self.storage_backend else 'input_bg',
+                  fg='#FFF' if backend == self.storage_backend else 'fg').pack(side='left', padx=(0, 10))
+
+        paint(tk.Label(content, text="关闭按钮", font=self.font_ui_small), fg='sub_text', bg='bg').pack(
+            anchor='w', pady=(20, 5))
+        r_frame = paint(tk.Frame(content), bg='bg')
+        r_frame.pack(fill='x')
+
+        def set_resident(resident):
+            self.resident = resident
+            self.save_config()
+            self.settings_win.destroy()
+            self.open_settings()
+
+        for resident, label in [(False, "退出程序"), (True, "常驻后台")]:
+            paint(tk.Button(r_frame, text=label, command=lambda r=resident: set_resident(r), bd=0, width=8,
+                            font=self.font_ui_small),
+                  bg='accent' if resident == self.resident else 'input_bg',
+                  fg='#FFF' if resident == self.resident else 'fg').pack(side='left', padx=(0, 10))
+
+        paint(tk.Label(content, text="自动归档已完成任务", font=self.font_ui_small), fg='sub_text', bg='bg').pack(
+            anchor='w', pady=(20, 5))
+        a_frame = paint(tk.Frame(content), bg='bg')
+        a_frame.pack(fill='x')
+
+        def set_archive_days(days):
+            self.archive_days = days
+            self.save_config()
+            self.settings_win.destroy()
+            self.open_settings()
+            if days:
+                self.run_archive()
+
+        for days, label in [(30, "30 天"), (90, "90 天"), (365, "一年"), (0, "关闭")]:
+            paint(tk.Button(a_frame, text=label, command=lambda d=days: set_archive_days(d), bd=0, width=6,
+                            font=self.font_ui_small),
+                  bg='accent' if days == self.archive_days else 'input_bg',
+                  fg='#FFF' if days == self.archive_days else 'fg').pack(side='left', padx=(0, 10))
+
+        paint(tk.Label(content, text="数据存储位置", font=self.font_ui_small), fg='sub_text', bg='bg').pack(
+            anchor='w', pady=(20, 5))
+        path_box = paint(tk.Frame(content, padx=10, pady=10), bg='input_bg')
         path_box.pack(fill='x')
-        tk.Label(path_box, text=self.data_dir, fg=self.colors['sub_text'], bg=self.colors['input_bg'],
-                 font=("Segoe UI", int(self.font_size * 0.7)), wraplength=320, justify='left').pack(fill='x')
+        paint(tk.Label(path_box, text=self.data_dir, font=self.font_path, wraplength=320, justify='left'),
+              fg='sub_text', bg='input_bg').pack(fill='x')
 
         def change_path():
             self.settings_win.attributes('-topmost', False)
+            from tkinter import filedialog
             new_dir = filedialog.askdirectory()
             self.settings_win.attributes('-topmost', True)
             if new_dir:
                 self.data_dir = new_dir
                 self.save_config()
-                # 重新计算 data_file_path 并加载数据
-                self.data_file_path = os.path.join(self.data_dir, DATA_FILE_NAME)
-                self.tasks_data = self.load_tasks_data()
-                self.render_tasks()
+                # 按新目录重新打开存储并加载数据
+                self.reopen_store()
                 self.settings_win.destroy()
 
-        tk.Button(content, text="更改文件夹...", command=change_path, bg=self.colors['bg'], fg=self.colors['accent'],
-                  bd=0, font=self.font_ui_bold, cursor="hand2").pack(anchor='e', pady=5)
+        paint(tk.Button(content, text="更改文件夹...", command=change_path, bd=0, font=self.font_ui_bold,
+                        cursor="hand2"), bg='bg', fg='accent').pack(anchor='e', pady=5)
+
+    # --- 搜索弹窗 ---
+    def ensure_search_index(self):
+        if self.search_index is not None or self.search_building:
+            return
+        self.search_building = True
+        # 归档的旧任务和重复任务也要能搜到，每天的排列与列表显示一致
+        store, load, result = self.model.store, self.model.history_loader(), {}
+
+        def build():
+            result['index'] = SearchIndex.build(load())
+
+        worker = threading.Thread(target=build, daemon=True)
+        worker.start()
+
+        def poll():
+            if worker.is_alive():
+                self.root.after(100, poll)
+                return
+            self.search_building = False
+            index = result.get('index')
+            if index is None or store is not self.model.store:
+                return
+            # 后台读到的可能不含本次运行的改动，这些日期都已在内存里，按内存重建
+            for k in self.search_dirty_days:
+                index.reindex_day(k, self.model.day(k))
+            self.search_index = index
+
+        self.root.after(100, poll)
+
+    def open_search(self, event=None):
+        if not self.ready:
+            return
+        if self.search_win is not None and self.search_win.winfo_exists():
+            self.search_win.lift()
+            self.search_entry.focus_force()
+            return
+        self.ensure_search_index()
+
+        self.search_win = tk.Toplevel(self.root)
+        self.search_win.overrideredirect(True)
+        self.search_win.configure(bg=self.colors['border'])
+        self.search_win.attributes('-topmost', True)
+        self.search_win.attributes('-alpha', self.opacity)
+        self.search_win.transient(self.root)
+        width = self.root.winfo_width() - 40
+        x = self.root.winfo_x() + 20
+        y = self.root.winfo_y() + 60
+        self.search_win.geometry(f"{width}x360+{x}+{y}")
+
+        inner = tk.Frame(self.search_win, bg=self.colors['bg'])
+        inner.pack(fill='both', expand=True, padx=1, pady=1)
+        top = tk.Frame(inner, bg=self.colors['input_bg'], padx=10, pady=5)
+        top.pack(fill='x', padx=10, pady=10)
+        self.search_entry = tk.Entry(top, font=self.font_ui_small, bg=self.colors['input_bg'],
+                                     fg=self.colors['input_fg'], bd=0, insertbackground=self.colors['fg'])
+        self.search_entry.pack(side='left', fill='both', expand=True, pady=3)
+        close_btn = tk.Label(top, text="×", fg=self.colors['sub_text'], bg=self.colors['input_bg'], font=("Arial", 14),
+                             cursor="hand2")
+        close_btn.pack(side='right')
+        results = tk.Frame(inner, bg=self.colors['bg'])
+        results.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+
+        def close_search(event=None):
+            if self.search_win: self.search_win.destroy()
+            self.search_win = None
+
+        def jump(date_key):
+            self.current_date = datetime.datetime.strptime(date_key, "%Y-%m-%d").date()
+            self.invalidate("header", "list")
+            close_search()
+
+        def hint(text):
+            tk.Label(results, text=text, fg=self.colors['sub_text'], bg=self.colors['bg'],
+                     font=self.font_ui_small).pack(pady=20)
+
+        def run_search(event=None):
+            if self.search_win is None:
+                return
+            for w in results.winfo_children(): w.destroy()
+            query = self.search_entry.get().strip()
+            if not query:
+                return
+            if self.search_index is None:
+                hint("正在建立索引…")
+                self.search_win.after(200, run_search)
+                return
+            hits = self.search_index.search(query, limit=SEARCH_LIMIT)
+            if not hits:
+                hint("没有找到相关任务")
+            for date_key, idx, text in hits:
+                lbl = tk.Label(results, text=f"{date_key[2:]}   {text}", fg=self.colors['fg'], bg=self.colors['bg'],
+                               font=self.font_ui_small, anchor='w', cursor="hand2")
+                lbl.pack(fill='x')
+                lbl.bind("<Button-1>", lambda e, k=date_key: jump(k))
+                lbl.bind("<Enter>", lambda e, w=lbl: w.config(bg=self.colors['hover']))
+                lbl.bind("<Leave>", lambda e, w=lbl: w.config(bg=self.colors['bg']))
+
+        close_btn.bind("<Button-1>", close_search)
+        self.search_entry.bind("<KeyRelease>", run_search)
+        self.search_entry.bind("<Escape>", close_search)
+        self.search_entry.focus_force()
 
     # --- 日历弹窗 ---
     def open_calendar(self, event=None):
@@ -538,61 +929,74 @@ class ModernTodoApp:
         self.cal_view_date = self.current_date
         self._cal_inner = inner
 
-        def close_cal():
-            self.root.unbind_all("<Button-1>")
-            if self.calendar_win: self.calendar_win.destroy()
-            self.calendar_win = None
+        close_cal = self.close_calendar
+
+        # 6x7 的日期格子只建一次，翻月时按缓存好的月份数据改文字和颜色
+        header = tk.Frame(self._cal_inner, bg=self.colors['cal_bg'])
+        header.pack(fill='x', pady=10, padx=10)
+        tk.Button(header, text="◀", command=lambda: change_month(-1), bg=self.colors['cal_bg'],
+                  fg=self.colors['fg'], bd=0, cursor="hand2", font=self.font_cal_day).pack(side='left')
+        title_lbl = tk.Label(header, text="", bg=self.colors['cal_bg'], fg=self.colors['fg'],
+                             font=self.font_cal_header)
+        title_lbl.pack(side='left', expand=True)
+        tk.Button(header, text="▶", command=lambda: change_month(1), bg=self.colors['cal_bg'], fg=self.colors['fg'],
+                  bd=0, cursor="hand2", font=self.font_cal_day).pack(side='right')
+
+        close_btn = tk.Label(self.calendar_win, text="×", bg=self.colors['cal_bg'], fg=self.colors['sub_text'],
+                             font=("Arial", int(self.font_size * 0.9)), cursor="hand2")
+        close_btn.place(relx=1.0, x=-5, y=2, anchor='ne')
+        close_btn.bind("<Button-1>", lambda e: close_cal())
+
+        days_header = tk.Frame(self._cal_inner, bg=self.colors['cal_bg'])
+        days_header.pack(pady=5)
+        day_width = max(3, int(4 * (14 / self.font_size)))
+        for day in ["一", "二", "三", "四", "五", "六", "日"]:
+            tk.Label(days_header, text=day, width=day_width, fg=self.colors['sub_text'], bg=self.colors['cal_bg'],
+                     font=self.font_cal_weekday).pack(side='left')
+
+        grid_frame = tk.Frame(self._cal_inner, bg=self.colors['cal_bg'])
+        grid_frame.pack(padx=10, pady=(0, 10))
+        cells = []
+        for _ in range(6):
+            row = tk.Frame(grid_frame, bg=self.colors['cal_bg'])
+            row.pack()
+            for _ in range(7):
+                btn = tk.Button(row, text=" ", width=day_width, bd=0, bg=self.colors['cal_bg'],
+                                activebackground=self.colors['hover'], activeforeground=self.colors['fg'])
+                btn.config(command=lambda b=btn: b.day and select_date(b.day))
+                btn.pack(side='left')
+                btn.day, btn.base_bg, btn.hoverable, btn.cfg = 0, self.colors['cal_bg'], False, None
+                btn.bind("<Enter>", lambda e, b=btn: b.hoverable and b.config(bg=self.colors['hover']))
+                btn.bind("<Leave>", lambda e, b=btn: b.hoverable and b.config(bg=b.base_bg))
+                cells.append(btn)
+
+        stats_lbl = tk.Label(self._cal_inner, text="", bg=self.colors['cal_bg'], fg=self.colors['sub_text'],
+                             font=self.font_cal_weekday)
+        stats_lbl.pack(pady=(0, 8))
 
         def render_cal_grid():
-            for w in self._cal_inner.winfo_children(): w.destroy()
-            header = tk.Frame(self._cal_inner, bg=self.colors['cal_bg'])
-            header.pack(fill='x', pady=10, padx=10)
-            tk.Button(header, text="◀", command=lambda: change_month(-1), bg=self.colors['cal_bg'],
-                      fg=self.colors['fg'], bd=0, cursor="hand2", font=self.font_cal_day).pack(side='left')
-            tk.Label(header, text=self.cal_view_date.strftime("%Y年 %m月"), bg=self.colors['cal_bg'],
-                     fg=self.colors['fg'], font=self.font_cal_header).pack(side='left', expand=True)
-            tk.Button(header, text="▶", command=lambda: change_month(1), bg=self.colors['cal_bg'], fg=self.colors['fg'],
-                      bd=0, cursor="hand2", font=self.font_cal_day).pack(side='right')
-
-            close_btn = tk.Label(self.calendar_win, text="×", bg=self.colors['cal_bg'], fg=self.colors['sub_text'],
-                                 font=("Arial", int(self.font_size * 0.9)), cursor="hand2")
-            close_btn.place(relx=1.0, x=-5, y=2, anchor='ne')
-            close_btn.bind("<Button-1>", lambda e: close_cal())
-
-            days_header = tk.Frame(self._cal_inner, bg=self.colors['cal_bg'])
-            days_header.pack(pady=5)
-            day_width = max(3, int(4 * (14 / self.font_size)))
-            for day in ["一", "二", "三", "四", "五", "六", "日"]:
-                tk.Label(days_header, text=day, width=day_width, fg=self.colors['sub_text'], bg=self.colors['cal_bg'],
-                         font=self.font_cal_weekday).pack(side='left')
-
-            cal = calendar.monthcalendar(self.cal_view_date.year, self.cal_view_date.month)
-            grid_frame = tk.Frame(self._cal_inner, bg=self.colors['cal_bg'])
-            grid_frame.pack(padx=10, pady=(0, 10))
+            y, m = self.cal_view_date.year, self.cal_view_date.month
+            title_lbl.config(text=self.cal_view_date.strftime("%Y年 %m月"))
+            total, done = self.model.month_stats(y, m)
+            stats_lbl.config(text=f"本月完成 {done}/{total} · {done * 100 // total}%" if total else "本月暂无任务")
             today = datetime.date.today()
-            for week in cal:
-                row = tk.Frame(grid_frame, bg=self.colors['cal_bg'])
-                row.pack()
-                for day in week:
-                    if day == 0:
-                        tk.Label(row, text=" ", width=day_width, bg=self.colors['cal_bg'], font=self.font_cal_day).pack(
-                            side='left')
-                    else:
-                        is_today = (
-                                    day == today.day and self.cal_view_date.month == today.month and self.cal_view_date.year == today.year)
-                        is_selected = (
-                                    day == self.current_date.day and self.cal_view_date.month == self.current_date.month and self.cal_view_date.year == self.current_date.year)
-                        bg_c = self.colors['cal_today'] if is_today else (
-                            self.colors['cal_bg'] if is_selected else self.colors['cal_bg'])
-                        fg_c = '#FFFFFF' if is_today else (self.colors['accent'] if is_selected else self.colors['fg'])
-                        btn = tk.Button(row, text=str(day), width=day_width, bd=0, bg=bg_c, fg=fg_c,
-                                        font=self.font_cal_day_bold if is_today else self.font_cal_day,
-                                        command=lambda d=day: select_date(d), cursor="hand2",
-                                        activebackground=self.colors['hover'], activeforeground=self.colors['fg'])
-                        btn.pack(side='left')
-                        if not is_today:
-                            btn.bind("<Enter>", lambda e, b=btn: b.config(bg=self.colors['hover']))
-                            btn.bind("<Leave>", lambda e, b=btn, c=bg_c: b.config(bg=c))
+            for btn, (day, bg_c, fg_c, has_open) in zip(cells, self.get_month_grid(y, m)):
+                is_today = day and (y, m, day) == (today.year, today.month, today.day)
+                is_selected = day and (y, m, day) == (self.current_date.year, self.current_date.month,
+                                                      self.current_date.day)
+                if is_today:
+                    bg_c, fg_c = self.colors['cal_today'], '#FFFFFF'
+                elif is_selected:
+                    fg_c = self.colors['accent']
+                # 有未完成任务的日子加粗标出
+                font = self.font_cal_day_bold if (is_today or has_open) else self.font_cal_day
+                cfg = (day, bg_c, fg_c, font)
+                if btn.cfg != cfg:
+                    btn.config(text=str(day) if day else " ", bg=bg_c, fg=fg_c, font=font,
+                               cursor="hand2" if day else "",
+                               activebackground=self.colors['hover'] if day else bg_c)
+                    btn.cfg = cfg
+                btn.day, btn.base_bg, btn.hoverable = day, bg_c, bool(day) and not is_today
 
         def change_month(step):
             y, m = self.cal_view_date.year, self.cal_view_date.month + step
@@ -605,7 +1009,7 @@ class ModernTodoApp:
 
         def select_date(day):
             self.current_date = datetime.date(self.cal_view_date.year, self.cal_view_date.month, day)
-            self.render_tasks()
+            self.invalidate("header", "list")
             close_cal()
 
         def check_click_outside(event):
@@ -618,57 +1022,289 @@ class ModernTodoApp:
             except:
                 pass
 
+        if self.profiler:
+            render_cal_grid = self.profiler.wrap("render_cal_grid", render_cal_grid)
+        self._cal_change_month = change_month
+        self._cal_render = render_cal_grid
         self.root.after(100, lambda: self.root.bind_all("<Button-1>", check_click_outside))
         render_cal_grid()
         self.calendar_win.focus_force()
 
+    def close_calendar(self):
+        self.root.unbind_all("<Button-1>")
+        if self.calendar_win: self.calendar_win.destroy()
+        self.calendar_win = None
+
+    def get_month_grid(self, year, month):
+        # 缓存 42 个格子的 (日期, 底色, 字色, 是否有未完成任务)，今天/选中日的高亮在绘制时再叠加
+        key = (year, month, self.theme_mode)
+        grid = self.cal_grid_cache.get(key)
+        if grid is None:
+            import calendar
+            weeks = calendar.monthcalendar(year, month)
+            weeks += [[0] * 7] * (6 - len(weeks))
+            grid = []
+            for week in weeks:
+                for day in week:
+                    has_open = bool(day) and self.model.open_count(f"{year:04d}-{month:02d}-{day:02d}") > 0
+                    grid.append((day, self.colors['cal_bg'], self.colors['fg'], has_open))
+            self.cal_grid_cache[key] = grid
+        return grid
+
+    def invalidate_month_grid(self, date_key):
+        year, month = int(date_key[:4]), int(date_key[5:7])
+        for key in [k for k in self.cal_grid_cache if k[:2] == (year, month)]:
+            del self.cal_grid_cache[key]
+        self.invalidate("calendar")
+
+    # --- 重绘调度 ---
+    def invalidate(self, *regions):
+        """标记要重画的区域："header" 日期栏、"list" 任务列表、"calendar" 打开着的日历。
+
+        连续几次换日期、远程批量改动等在同一轮事件循环里只触发一次重画。
+        """
+        self.dirty.update(regions)
+        if self.paint_job is None:
+            self.paint_job = self.root.after_idle(self.paint_dirty)
+
+    def paint_dirty(self):
+        self.paint_job = None
+        dirty, self.dirty = self.dirty, set()
+        if "header" in dirty:
+            self.update_date_display()
+        if "list" in dirty:
+            self.render_list()
+        if "calendar" in dirty and self.calendar_win is not None and self.calendar_win.winfo_exists():
+            self._cal_render()
+
     # --- 渲染逻辑 ---
+    # 列表只在换日期、换字号等时整体重建；增删改通过 task_rows（任务编号 -> 行）只修补变化的那一行
     def render_tasks(self):
+        # 立即重画日期栏和列表，启动首帧、基准测试用；交互路径走 invalidate
+        self.dirty.discard("header")
+        self.dirty.discard("list")
         self.update_date_display()
-        bg_color = self.colors['bg']
+        self.render_list()
+
+    def render_list(self):
+        if not self.ready:
+            return
         for w in self.scroll_frame.winfo_children(): w.destroy()
+        self.task_rows = {}
+        self.empty_hint = None
+        self.canvas.yview_moveto(0)
         date_key = self.current_date.strftime("%Y-%m-%d")
-        tasks = self.tasks_data.get(date_key, [])
+        tasks = self.model.day(date_key)
+        if self.canvas_list:
+            self.canvas_list.render(tasks)
+            return
+        self.virtual_mode = len(tasks) > self.virtual_threshold
+        # 虚拟模式下 scroll_frame 固定为视口高度，行用 place 摆放；否则交回给内容自身的高度
+        self.canvas.itemconfig(self.canvas_window, height=self.list_viewport_h if self.virtual_mode else 0)
+        if self.virtual_mode:
+            self.render_virtual(tasks)
+            return
         if not tasks:
-            f = tk.Frame(self.scroll_frame, bg=bg_color)
-            f.pack(pady=40, fill='both', expand=True)
-            tk.Label(f, text="☕", font=("Segoe UI", 30), bg=bg_color).pack(anchor='center')
-            tk.Label(f, text="今日无事，保持专注", fg=self.colors['sub_text'], bg=bg_color, font=("Segoe UI", 11)).pack(
-                pady=5, anchor='center')
+            self.show_empty_hint()
             return
+        for task in tasks:
+            self.task_rows[task['id']] = self.create_task_row(task)
+
+    # --- 虚拟列表：固定数量的行控件循环复用 ---
+    def render_virtual(self, tasks):
+        self.virtual_tasks = tasks
+        self.virtual_top = 0
+        self.virtual_row_h = max(18, int(self.font_size * 1.4)) + 16
+        self.virtual_pool = []
+        self.layout_virtual_rows()
+
+    def layout_virtual_rows(self):
+        row_h, n = self.virtual_row_h, len(self.virtual_tasks)
+        viewport_h = self.list_viewport_h or INIT_H
+        self.virtual_top = max(0, min(self.virtual_top, n * row_h - viewport_h))
+        while len(self.virtual_pool) < viewport_h // row_h + 2:
+            row = self.create_task_row(None)
+            row.task_index = -1
+            self.virtual_pool.append(row)
+        pool_size = len(self.virtual_pool)
+        first, offset = divmod(self.virtual_top, row_h)
+        visible = set()
+        for idx in range(first, min(first + pool_size, n)):
+            # 按 idx % pool_size 固定槽位，滚动一行只需要重新绑定一个控件
+            row = self.virtual_pool[idx % pool_size]
+            if row.task_index != idx:
+                self.bind_virtual_row(row, idx)
+            row.place(x=0, y=(idx - first) * row_h - offset, relwidth=1, height=row_h)
+            visible.add(row)
+        for row in self.virtual_pool:
+            if row not in visible:
+                row.place_forget()
+                row.task_index = -1
+
+    def bind_virtual_row(self, row, idx):
+        task = self.virtual_tasks[idx]
+        row.task_index, row.task_id = idx, task['id']
+        row.checkbox.checked = task['done']
+        self._draw_checkbox(row.checkbox)
+        row.lbl.config(text=self.task_text(task), fg=self.colors['sub_text'] if task['done'] else self.colors['fg'])
+
+    def refresh_virtual_rows(self):
+        for row in self.virtual_pool:
+            row.task_index = -1
+        self.layout_virtual_rows()
+
+    def task_text(self, task):
+        return REPEAT_MARK + task['text'] if 'rule' in task else task['text']
+
+    def show_empty_hint(self):
+        paint = self.style.paint
+        f = paint(tk.Frame(self.scroll_frame), bg='bg')
+        f.pack(pady=40, fill='both', expand=True)
+        paint(tk.Label(f, text="☕", font=("Segoe UI", 30)), bg='bg').pack(anchor='center')
+        paint(tk.Label(f, text="今日无事，保持专注", font=("Segoe UI", 11)), fg='sub_text', bg='bg').pack(
+            pady=5, anchor='center')
+        self.empty_hint = f
+
+    def create_task_row(self, task):
+        # task 为 None 时创建的是虚拟列表的空行，内容稍后由 bind_virtual_row 填入
+        bg_color = self.colors['bg']
         checkbox_size = max(18, int(self.font_size * 1.4))
-        for i, task in enumerate(tasks):
-            row = tk.Frame(self.scroll_frame, bg=bg_color)
+        row = tk.Frame(self.scroll_frame, bg=bg_color)
+        if task is not None:
             row.pack(fill='x', pady=6)
-            checkbox = self.create_checkbox(row, checked=task['done'], size=checkbox_size,
-                                            command=lambda idx=i: self.toggle_task(idx))
-            checkbox.pack(side='left', padx=(0, 10), pady=2)
-            text_fg = self.colors['fg'] if not task['done'] else self.colors['sub_text']
-            lbl = tk.Label(row, text=task['text'], fg=text_fg, bg=bg_color, font=self.font_main, anchor='w',
-                           wraplength=260, justify='left')
-            lbl.pack(side='left', fill='x', expand=True, pady=2)
-            lbl.bind("<Button-1>", lambda e, idx=i: self.toggle_task(idx))
-            lbl.config(cursor="hand2")
-            d_btn = tk.Label(row, text="×", fg=bg_color, bg=bg_color, font=("Arial", 16), cursor="hand2", width=2)
-            d_btn.pack(side='right', anchor='n')
-            d_btn.bind("<Button-1>", lambda e, idx=i: self.delete_task(idx))
-
-            def on_row_enter(e, b=d_btn, r=row, t=lbl, c=checkbox, bg=bg_color):
-                hover_bg = self.colors['hover']
-                r.config(bg=hover_bg);
-                t.config(bg=hover_bg);
-                c.config(bg=hover_bg)
-                b.config(bg=hover_bg, fg=self.colors['sub_text'])
-
-            def on_row_leave(e, b=d_btn, r=row, t=lbl, c=checkbox, bg=bg_color):
-                r.config(bg=bg);
-                t.config(bg=bg);
-                c.config(bg=bg)
-                b.config(bg=bg, fg=bg)
-
-            for w in [row, lbl, d_btn]:
-                w.bind("<Enter>", lambda e, b=d_btn, r=row, t=lbl, c=checkbox: on_row_enter(e, b, r, t, c))
-                w.bind("<Leave>", lambda e, b=d_btn, r=row, t=lbl, c=checkbox: on_row_leave(e, b, r, t, c))
+        # 行上只记任务编号，事件处理按它操作；虚拟列表复用行时改写 task_id
+        row.task_id = task['id'] if task else None
+        # 任务行的复选框不自己翻转，点击后由 patch_row_toggled 按数据重画
+        checkbox = self.create_checkbox(row, checked=bool(task and task['done']), size=checkbox_size,
+                                        tag=ROW_TOGGLE_TAG)
+        checkbox.pack(side='left', padx=(0, 10), pady=2)
+        text_fg = self.colors['sub_text'] if task and task['done'] else self.colors['fg']
+        lbl = tk.Label(row, text=self.task_text(task) if task else "", fg=text_fg, bg=bg_color, font=self.font_main,
+                       anchor='w', wraplength=0 if task is None else 260, justify='left')
+        lbl.pack(side='left', fill='x', expand=True, pady=2)
+        lbl.config(cursor="hand2")
+        d_btn = tk.Label(row, text="×", fg=bg_color, bg=bg_color, font=("Arial", 16), cursor="hand2", width=2)
+        d_btn.pack(side='right', anchor='n')
+        row.checkbox, row.lbl, row.d_btn = checkbox, lbl, d_btn
+        # 悬停和点击都由 bind_row_events 里的类级别处理函数接手，这里不注册任何回调
+        self.add_bindtags(row, ROW_HOVER_TAG)
+        self.add_bindtags(lbl, ROW_HOVER_TAG, ROW_TOGGLE_TAG)
+        self.add_bindtags(d_btn, ROW_HOVER_TAG, ROW_DELETE_TAG)
+        return row
+
+    # --- 任务行事件：全部行共用一组处理函数 ---
+    def bind_row_events(self):
+        self.root.bind_class(ROW_HOVER_TAG, "<Enter>", self.on_row_enter)
+        self.root.bind_class(ROW_HOVER_TAG, "<Leave>", self.on_row_leave)
+        self.root.bind_class(ROW_TOGGLE_TAG, "<Button-1>", self.on_row_click)
+        self.root.bind_class(ROW_DELETE_TAG, "<Button-1>", self.on_row_delete)
+
+    def event_row(self, event):
+        # 行本身或它的子控件；控件已销毁时 event.widget 只是路径字符串
+        w = event.widget
+        if isinstance(w, str):
+            return None
+        return w if hasattr(w, 'task_id') else getattr(w, 'master', None)
+
+    def on_row_enter(self, event):
+        row = self.event_row(event)
+        if row is None:
+            return
+        hover_bg = self.colors['hover']
+        for w in (row, row.lbl, row.checkbox):
+            w.config(bg=hover_bg)
+        row.d_btn.config(bg=hover_bg, fg=self.colors['sub_text'])
+
+    def on_row_leave(self, event):
+        row = self.event_row(event)
+        if row is None:
+            return
+        bg = self.colors['bg']  # 换主题后行不重建，颜色要在离开时现取
+        for w in (row, row.lbl, row.checkbox):
+            w.config(bg=bg)
+        row.d_btn.config(bg=bg, fg=bg)
+
+    def on_row_click(self, event):
+        row = self.event_row(event)
+        if row is not None and row.task_id is not None:
+            self.toggle_task(row.task_id)
+
+    def on_row_delete(self, event):
+        row = self.event_row(event)
+        if row is not None and row.task_id is not None:
+            self.delete_task(row.task_id, whole_series=bool(event.state & 0x0001))
+
+    def paint_row(self, row, task):
+        bg = self.colors['bg']
+        for w in (row, row.lbl, row.checkbox):
+            w.config(bg=bg)
+        row.d_btn.config(bg=bg, fg=bg)
+        if task is not None:
+            row.lbl.config(fg=self.colors['sub_text'] if task['done'] else self.colors['fg'])
+        self._draw_checkbox(row.checkbox)
+
+    def restyle_list(self):
+        if not self.ready:
+            return
+        if self.canvas_list:
+            self.canvas_list.render(self.canvas_list.tasks)
+        elif self.virtual_mode:
+            for row in self.virtual_pool:
+                self.paint_row(row, None)
+            self.refresh_virtual_rows()
+        else:
+            for task in self.model.day(self.current_date.strftime("%Y-%m-%d")):
+                if task['id'] in self.task_rows:
+                    self.paint_row(self.task_rows[task['id']], task)
+
+    def patch_row_added(self, task):
+        if "list" in self.dirty:
+            return  # 整张列表马上要重画，行控件已经过时
+        if self.canvas_list:
+            self.canvas_list.row_added(task)
+            return
+        if self.virtual_mode:
+            self.refresh_virtual_rows()
+            return
+        if len(self.task_rows) >= self.virtual_threshold:
+            self.invalidate("list")
+            return
+        if self.empty_hint:
+            self.empty_hint.destroy()
+            self.empty_hint = None
+        self.task_rows[task['id']] = self.create_task_row(task)
+
+    def patch_row_toggled(self, task):
+        if "list" in self.dirty:
+            return  # 整张列表马上要重画，行控件已经过时
+        if self.canvas_list:
+            idx = self.model.position(self.current_date.strftime("%Y-%m-%d"), task['id'])
+            self.canvas_list.row_toggled(idx, task)
+            return
+        if self.virtual_mode:
+            for row in self.virtual_pool:
+                if row.task_index >= 0 and row.task_id == task['id']:
+                    self.bind_virtual_row(row, row.task_index)
+            return
+        row = self.task_rows[task['id']]
+        if row.checkbox.checked != task['done']:
+            # 复选框不自己翻转，这里按数据重画
+            row.checkbox.checked = task['done']
+            self._draw_checkbox(row.checkbox)
+        row.lbl.config(fg=self.colors['sub_text'] if task['done'] else self.colors['fg'])
+
+    def patch_row_removed(self, task_id, idx):
+        if "list" in self.dirty:
+            return  # 整张列表马上要重画，行控件已经过时
+        if self.canvas_list:
+            self.canvas_list.row_removed(idx)
+            return
+        if self.virtual_mode:
+            self.refresh_virtual_rows()
+            return
+        self.task_rows.pop(task_id).destroy()
+        if not self.task_rows:
+            self.show_empty_hint()
 
     def update_date_display(self):
         txt = self.current_date.strftime("%m / %d")
@@ -679,71 +1315,263 @@ class ModernTodoApp:
         final_txt = f"{prefix} · {txt}" if prefix else f"{week_day} · {txt}"
         self.lbl_date.config(text=final_txt)
 
+    def reopen_store(self, backend=None):
+        if not self.ready:
+            # 分阶段启动时数据还没读进来：换目录由 finish_startup 按新的 data_dir 读取，换后端等加载完再操作
+            return
+        self.wait_archive()
+        self.model.close()
+        if backend is not None:
+            # 换后端：把当前后端的全部任务搬过去，原来的改名 .bak 留底，两边不会各存一份
+            try:
+                convert_store(self.data_dir, self.storage_backend, backend)
+            except (OSError, ValueError) as e:
+                from tkinter import messagebox
+                messagebox.showerror("切换存储失败", f"{e}\n\n仍使用原来的存储，数据没有改动。")
+            else:
+                self.storage_backend = backend
+                self.save_config()
+        self.model = self.load_model()
+        if self.model is None:
+            self.exit_on_data_error()
+            return
+        self.cal_grid_cache = {}
+        self.search_index = None
+        self.search_dirty_days = set()
+        self.invalidate("header", "list", "calendar")
+
     def change_date(self, offset):
         self.current_date += datetime.timedelta(days=offset)
-        self.render_tasks()
+        self.invalidate("header", "list")
 
     def add_task(self, event=None):
         text = self.entry.get().strip()
-        if text and text != self.placeholder_text:
-            k = self.current_date.strftime("%Y-%m-%d")
-            if k not in self.tasks_data: self.tasks_data[k] = []
-            self.tasks_data[k].append({"text": text, "done": False})
+        if self.ready and text and text != self.placeholder_text:
             self.entry.delete(0, tk.END)
-            self.save_tasks_data()
-            self.render_tasks()
+            self.insert_task(text)
 
-    def toggle_task(self, idx):
+    def insert_task(self, text):
+        """把任务加到当前日期，输入框回车和外部命令共用。末尾带“每天”等标记时建成重复规则。"""
         k = self.current_date.strftime("%Y-%m-%d")
-        self.tasks_data[k][idx]['done'] = not self.tasks_data[k][idx]['done']
-        self.save_tasks_data()
-        self.render_tasks()
+        repeat = parse_repeat(text)
+        if repeat:
+            self.refresh_days(self.model.add_rule(k, *repeat))
+            return
+        task = self.model.add(k, text)
+        self.search_dirty_days.add(k)
+        if self.search_index:
+            self.search_index.add(k, len(self.model.day(k)) - 1, text)
+        self.invalidate_month_grid(k)
+        self.patch_row_added(task)
+
+    def toggle_task(self, task_id):
+        k = self.current_date.strftime("%Y-%m-%d")
+        if self.model.task(k, task_id) is None:
+            return  # 行控件还没来得及随数据更新
+        task = self.model.toggle(k, task_id)
+        self.invalidate_month_grid(k)
+        self.patch_row_toggled(task)
 
-    def delete_task(self, idx):
+    def delete_task(self, task_id, whole_series=False):
         k = self.current_date.strftime("%Y-%m-%d")
-        del self.tasks_data[k][idx]
-        self.save_tasks_data()
-        self.render_tasks()
+        task = self.model.task(k, task_id)
+        if task is None:
+            return
+        if whole_series and 'rule' in task:
+            # Shift+删除重复任务：从这天起停掉整条规则
+            self.refresh_days(self.model.end_rule(k, task_id))
+            return
+        idx = self.model.position(k, task_id)  # 删除前的下标，画布列表按它挪动后面的行
+        if self.model.delete(k, task_id) is None:
+            return  # 归档里的任务只读
+        self.search_dirty_days.add(k)
+        if self.search_index:
+            self.search_index.reindex_day(k, self.model.day(k))
+        self.invalidate_month_grid(k)
+        self.patch_row_removed(task_id, idx)
+
+    def refresh_days(self, date_keys):
+        # 重复规则变化会波及多天：清掉这些天的搜索和日历缓存，当前日期整体重画
+        for k in date_keys:
+            self.search_dirty_days.add(k)
+            if self.search_index:
+                self.search_index.reindex_day(k, self.model.day(k))
+        self.cal_grid_cache = {}
+        self.invalidate("header", "list", "calendar")
+
+    # --- 撤销 / 重做 ---
+    def undo(self, event=None):
+        if self.ready:
+            self.show_history_step(self.model.undo())
+
+    def redo(self, event=None):
+        if self.ready:
+            self.show_history_step(self.model.redo())
+
+    def show_history_step(self, result):
+        if result is None:
+            return
+        date_key, date_keys = result
+        # 撤销的那一步不在当前日期时先翻过去，改了什么一眼能看到
+        self.current_date = datetime.datetime.strptime(date_key, "%Y-%m-%d").date()
+        self.refresh_days(date_keys)
 
     def on_entry_focus_in(self, e):
         if self.entry.get() == self.placeholder_text:
             self.entry.delete(0, tk.END)
-            self.entry.config(fg=self.colors['input_fg'])
+            self.style.paint(self.entry, fg='input_fg')
 
     def on_entry_focus_out(self, e):
         if not self.entry.get():
             self.entry.insert(0, self.placeholder_text)
-            self.entry.config(fg=self.colors['sub_text'])
+            self.style.paint(self.entry, fg='sub_text')
+
+    # --- 单实例 / 常驻 ---
+    def attach_instance(self, server):
+        self.instance = server
+        self.root.after(INSTANCE_POLL_MS, self.poll_instance)
+
+    def poll_instance(self):
+        if self.instance is None:
+            return
+        # 数据还没加载完时先把命令留在队列里
+        if self.ready:
+            for message in self.instance.poll():
+                self.handle_remote(message)
+        self.root.after(INSTANCE_POLL_MS, self.poll_instance)
+
+    def handle_when_ready(self, message):
+        # 数据还没加载完就等一等，与 poll_instance 一样
+        if not self.ready:
+            self.root.after(INSTANCE_POLL_MS, lambda: self.handle_when_ready(message))
+            return
+        self.handle_remote(message)
+
+    def handle_remote(self, message):
+        cmd = message.get("cmd")
+        if cmd == "quit":
+            self.save_and_exit()
+            return
+        if cmd == "ops":
+            # 命令行的批量改动：不弹出窗口，只刷新受影响的部分
+            ops = message.get("ops", [])
+            touched, _ = self.model.apply_ops(ops)
+            if any(op.get("op") == "add" and parse_repeat(op.get("text", "")) for op in ops):
+                self.cal_grid_cache = {}  # 新的重复规则会波及之后每个月的日历
+            for k in touched:
+                self.search_dirty_days.add(k)
+                if self.search_index:
+                    self.search_index.reindex_day(k, self.model.day(k))
+                self.invalidate_month_grid(k)
+            if self.current_date.strftime("%Y-%m-%d") in touched:
+                self.invalidate("list")
+            return
+        self.summon()
+        text = (message.get("text") or "").strip()
+        if cmd == "add" and text:
+            self.insert_task(text)
+
+    def summon(self):
+        # 再次打开就是回到今天；隐藏期间跨了天也一样
+        today = datetime.date.today()
+        if self.current_date != today:
+            self.current_date = today
+            self.invalidate("header", "list")
+        self.root.deiconify()
+        self.root.lift()
+        self.root.attributes('-topmost', True)
+        if not self.is_topmost:
+            self.root.after(200, lambda: self.root.attributes('-topmost', False))
+        self.root.focus_force()
+        self.entry.focus_set()
+
+    def close_window(self, event=None):
+        # 常驻模式下关闭只是隐藏，按住 Shift 点击才真正退出
+        if self.resident and self.instance is not None and not (event and event.state & 0x0001):
+            self.save_config()
+            self.writer.flush()
+            self.root.withdraw()
+            return
+        self.save_and_exit()
 
     def save_and_exit(self):
+        if self.instance is not None:
+            self.instance.close()
+            self.instance = None
         self.save_config()
+        self.wait_archive()
+        if self.ready:
+            self.model.close()
+        self.writer.flush()
+        self.root.destroy()
+
+    def exit_on_data_error(self):
+        # 数据读不出来时直接关掉：不保存配置、不写任何文件，磁盘上保持出错时的原样
+        self.ready = False
+        if self.instance is not None:
+            self.instance.close()
+            self.instance = None
         self.root.destroy()
 
+    # --- 拖动 / 缩放 ---
+    # 高回报率鼠标每秒几百个 Motion 事件：事件里只算目标几何，按帧合并成一次 geometry 调用
     def start_move(self, event):
-        self.x, self.y = event.x, event.y
+        # 按下时记住窗口相对指针的偏移，之后只用事件自带的屏幕坐标，不再每次查询 winfo_x/winfo_y
+        self.move_dx, self.move_dy = self.root.winfo_x() - event.x_root, self.root.winfo_y() - event.y_root
 
     def do_move(self, event):
-        self.root.geometry(f"+{self.root.winfo_x() + event.x - self.x}+{self.root.winfo_y() + event.y - self.y}")
+        self.request_geometry(f"+{event.x_root + self.move_dx}+{event.y_root + self.move_dy}")
 
     def start_resize(self, event):
         self.resize_start_x, self.resize_start_y, self.start_w, self.start_h = event.x_root, event.y_root, self.root.winfo_width(), self.root.winfo_height()
+        self.resizing = True
 
     def do_resize(self, event):
         new_w, new_h = self.start_w + event.x_root - self.resize_start_x, self.start_h + event.y_root - self.resize_start_y
         if new_w > MIN_WIDTH and new_h > MIN_HEIGHT:
-            self.root.geometry(f"{new_w}x{new_h}")
-            if self.canvas.find_all(): self.canvas.itemconfig(self.canvas_window, width=new_w - 45)
+            self.request_geometry(f"{new_w}x{new_h}")
+
+    def end_resize(self, event):
+        self.flush_geometry()
+        self.resizing = False
+        if self.pending_list_size:
+            size, self.pending_list_size = self.pending_list_size, None
+            self.relayout_list(*size)
+
+    def request_geometry(self, geometry):
+        self.pending_geometry = geometry
+        if self.geometry_job is None:
+            self.geometry_job = self.root.after(FRAME_MS, self.flush_geometry)
+
+    def flush_geometry(self):
+        if self.geometry_job is not None:
+            self.root.after_cancel(self.geometry_job)
+            self.geometry_job = None
+        if self.pending_geometry:
+            self.root.geometry(self.pending_geometry)
+            self.pending_geometry = None
 
     def toggle_theme(self):
         self.theme_mode = "light" if self.theme_mode == "dark" else "dark"
         self.save_config()
-        self.setup_ui()
-        self.render_tasks()
+        self.apply_theme()
+
+    def apply_theme(self):
+        # 样式表里的控件一次遍历就地改色；列表行随渲染创建、不进样式表，由 restyle_list 单独重涂
+        self.colors = THEMES[self.theme_mode]
+        self.style.apply(self.colors)
+        self.restyle_list()
+        # 搜索结果和日历是临时弹窗，不进样式表，关掉即可，下次打开用新配色
+        if self.search_win is not None and self.search_win.winfo_exists():
+            self.search_win.destroy()
+            self.search_win = None
+        if self.calendar_win is not None and self.calendar_win.winfo_exists():
+            self.close_calendar()
 
     def toggle_topmost(self, event=None):
         self.is_topmost = not self.is_topmost
         self.root.attributes('-topmost', self.is_topmost)
-        self.btn_pin.config(fg=self.colors['accent'] if self.is_topmost else self.colors['sub_text'])
+        self.style.paint(self.btn_pin, fg='accent' if self.is_topmost else 'sub_text')
         self.save_config()
 
     def create_tooltip(self, widget, text):
@@ -764,6 +1592,30 @@ class ModernTodoApp:
 
 
 if __name__ == "__main__":
+    # 子命令走命令行，不创建窗口：python Focus.py add/list/done/import ...（详见 focus_cli.py）
+    cli_args = sys.argv[3:] if sys.argv[1:2] == ["--data-dir"] else sys.argv[1:]
+    if cli_args[:1] and cli_args[0] in ("add", "list", "done", "import"):
+        import focus_cli
+        sys.exit(focus_cli.main(sys.argv[1:]))
+    # 用法：Focus.exe                  打开窗口（已在运行则直接唤出）
+    #       Focus.exe --add "写周报"    往今天加一条任务
+    #       Focus.exe --quit            让常驻实例保存并退出
+    args = sys.argv[1:]
+    token_dir = find_config_dir()  # 单实例口令放在配置所在的数据目录
+    if args[:1] == ["--quit"]:
+        sys.exit(0 if send_to_running({"cmd": "quit"}, token_dir) else 1)
+    if args[:1] == ["--add"]:
+        message = {"cmd": "add", "text": " ".join(args[1:])}
+    else:
+        message = {"cmd": "show"}
+    forwarded, server = start_or_forward(message, token_dir)
+    if forwarded:
+        sys.exit(0)
     root = tk.Tk()
     app = ModernTodoApp(root)
+    if server is not None:
+        app.attach_instance(server)
+    if message["cmd"] == "add":
+        # 没拿到监听端口（server 为 None）时也要把这条任务加上
+        app.handle_when_ready(message)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,112 @@
+import collections
+import gzip
+import json
+import os
+import threading
+
+from focus_storage import commit_file, fsync_file, read_checked
+
+ARCHIVE_CACHE_YEARS = 4  # 最近打开的几个年度归档常驻内存
+UNTIL_FILE_NAME = "archived_until"  # 记录已经归档到哪一天，下次只处理之后新变旧的日期
+ARCHIVE_KEEP = 1  # 归档文件较大，只多留一版；gzip 自带 CRC32，读取时顺带校验
+
+
+def load_gzip_json(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class TaskArchive:
+    """已完成旧任务的冷存储：每年一个 gzip 压缩的 JSON（archive/2024.json.gz），{日期: [任务]}。
+
+    翻看历史、搜索、日历统计需要时才解压对应年份，最近用过的几年放在 LRU 缓存里。
+    """
+
+    def __init__(self, archive_dir, cache_size=ARCHIVE_CACHE_YEARS):
+        self.archive_dir = archive_dir
+        self.cache_size = cache_size
+        self._cache = collections.OrderedDict()
+        self._lock = threading.Lock()  # 搜索在后台线程里也会读归档
+        self._years = None
+
+    def _path(self, year):
+        return os.path.join(self.archive_dir, f"{year}.json.gz")
+
+    def years(self):
+        if self._years is None:
+            names = os.listdir(self.archive_dir) if os.path.isdir(self.archive_dir) else []
+            self._years = {int(name[:4]) for name in names
+                           if name[4:] in (".json.gz", ".json.gz.1") and name[:4].isdigit()}
+        return self._years
+
+    # --- 读取 ---
+    def load_year(self, year, cache=True):
+        if year not in self.years():
+            return {}
+        with self._lock:
+            data = self._cache.get(year)
+            if data is not None:
+                self._cache.move_to_end(year)
+                return data
+        data = read_checked(self._path(year), load_gzip_json, ARCHIVE_KEEP) or {}
+        if cache:
+            with self._lock:
+                self._cache[year] = data
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return data
+
+    def day(self, date_key):
+        return self.load_year(int(date_key[:4])).get(date_key, [])
+
+    def month_counts(self, year, month):
+        prefix = f"{year:04d}-{month:02d}-"
+        return sum(len(tasks) for k, tasks in self.load_year(year).items() if k.startswith(prefix))
+
+    def load(self):
+        """全部归档，给搜索建索引用；不进 LRU，免得把最近翻看的年份挤掉。"""
+        data = {}
+        for year in sorted(self.years()):
+            data.update(self.load_year(year, cache=False))
+        return data
+
+    def until(self):
+        try:
+            with open(os.path.join(self.archive_dir, UNTIL_FILE_NAME), "r", encoding="utf-8") as f:
+                return f.read().strip() or "0000-00-00"
+        except OSError:
+            return "0000-00-00"
+
+    # --- 写入 ---
+    def set_until(self, date_key):
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, UNTIL_FILE_NAME)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(date_key)
+            fsync_file(f)
+        commit_file(path + ".tmp", path, keep=0)
+
+    def add(self, moved):
+        """把 {日期: [任务]} 并入对应年份的归档文件，整份写好再替换，中途失败不影响旧归档。
+
+        同一天里编号已在归档中的任务跳过：上次归档写完文件后没来得及删数据或记下进度就中断时，重跑不会多出一份。
+        """
+        by_year = {}
+        for k, tasks in moved.items():
+            by_year.setdefault(int(k[:4]), {})[k] = tasks
+        os.makedirs(self.archive_dir, exist_ok=True)
+        for year, days in by_year.items():
+            data = {k: list(v) for k, v in self.load_year(year, cache=False).items()}
+            for k, tasks in days.items():
+                day = data.setdefault(k, [])
+                ids = {t.get("id") for t in day}
+                day.extend(t for t in tasks if t.get("id") is None or t["id"] not in ids)
+            tmp_path = self._path(year) + ".tmp"
+            with open(tmp_path, "wb") as raw:
+                with gzip.open(raw, "wt", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+                fsync_file(raw)
+            commit_file(tmp_path, self._path(year), ARCHIVE_KEEP)
+            with self._lock:
+                self._cache.pop(year, None)
+            self.years().add(year)
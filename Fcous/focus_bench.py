@@ -0,0 +1,258 @@
+"""Focus 性能基准：生成 N 天 x M 条的模拟数据，对存储和界面热点路径计时。
+
+用法：
+    python focus_bench.py --days 3650 --tasks 10 --out bench.json
+    python focus_bench.py --baseline bench_baseline.json      # 与基线对比，退化超过阈值时返回 1
+    python focus_bench.py --save-baseline bench_baseline.json  # 把本次结果存为新基线
+
+界面部分需要显示环境，Linux 服务器上可以用 xvfb-run 运行；没有显示时自动只跑存储部分。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from focus_storage import BackgroundWriter, ShardedTaskStore, migrate_to_shards, read_legacy
+
+TASK_WORDS = ["写周报", "整理资料", "健身", "跑步", "读书", "学习英语", "买菜", "开会", "review PR",
+              "打电话", "背单词", "复盘", "项目计划", "修 bug", "剪视频", "回邮件"]
+
+
+# --- 数据生成 ---
+def generate(data_dir, days, per_day, seed=0):
+    rng = random.Random(seed)
+    today = datetime.date.today()
+    data = {}
+    for offset in range(days):
+        k = (today - datetime.timedelta(days=offset)).strftime("%Y-%m-%d")
+        data[k] = [{"text": f"{rng.choice(TASK_WORDS)} {rng.randint(1, 999)}", "done": rng.random() < 0.7}
+                   for _ in range(per_day)]
+    os.makedirs(data_dir, exist_ok=True)
+    # 旧版单文件格式，界面部分计时前先和老用户一样迁移一次
+    with open(os.path.join(data_dir, "todo_data.json"), "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    return data
+
+
+# --- 计时 ---
+def measure(fn, runs, setup=None):
+    samples = []
+    for _ in range(runs):
+        state = setup() if setup else None
+        start = time.perf_counter()
+        fn(state) if setup else fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {"median_ms": round(statistics.median(samples), 3),
+            "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            "max_ms": round(samples[-1], 3),
+            "runs": runs}
+
+
+def window_keys():
+    today = datetime.date.today()
+    start = today - datetime.timedelta(days=31)
+    end = today + datetime.timedelta(days=31)
+    return start.strftime("%Y-%m-01"), end.strftime("%Y-%m-31")
+
+
+def bench_storage(data_dir, runs):
+    path = os.path.join(data_dir, "todo_data.json")
+    results = {}
+    results["legacy_read_full"] = measure(lambda: read_legacy(path), runs)
+
+    # 按月分片：放在单独的目录里，不影响界面部分对单文件的自动迁移
+    shard_dir = os.path.join(data_dir, "bench_months")
+    migrate_to_shards(read_legacy(path), shard_dir)
+    results["shard_load_window"] = measure(lambda: ShardedTaskStore(shard_dir).load_range(*window_keys()), runs)
+    results["shard_load_full"] = measure(lambda: ShardedTaskStore(shard_dir).load(), runs)
+    results["shard_day_stats"] = measure(lambda: ShardedTaskStore(shard_dir).day_stats(), runs)
+
+    def toggle_burst(store):
+        k = datetime.date.today().strftime("%Y-%m-%d")
+        for i in range(200):
+            store.toggle(k, i % 10 + 1, i % 2 == 0)  # 生成的数据没有编号，读入时按顺序补成 1..n
+        store.close()
+
+    def fresh_shards():
+        store = ShardedTaskStore(shard_dir, writer=BackgroundWriter(delay=0))
+        store.load_range(*window_keys())
+        return store
+
+    results["shard_toggle_burst_200"] = measure(toggle_burst, runs, setup=fresh_shards)
+    return results
+
+
+def bench_gui(data_dir, runs):
+    import tkinter as tk
+    from types import SimpleNamespace as Event
+    from Focus import ModernTodoApp
+    from focus_model import open_store
+
+    results = {}
+    apps = []
+
+    # 迁移只发生一次，单独记一个样本；否则 app_startup 的第一个样本里混着整份迁移
+    results["legacy_migrate_once"] = measure(lambda: open_store(data_dir).close(), 1)
+
+    def new_app():
+        root = tk.Tk()
+        root.withdraw()
+        app = ModernTodoApp(root, data_dir=data_dir)
+        root.update()  # 列表区和数据在首帧后的 after_idle 里完成，计入启动耗时
+        apps.append(app)
+        return app
+
+    def close_all():
+        while apps:
+            app = apps.pop()
+            app.model.close()
+            app.writer.flush()
+            app.root.destroy()
+
+    results["app_startup"] = measure(lambda: new_app(), runs)
+    close_all()
+
+    app = new_app()
+    root = app.root
+
+    def reload_data():
+        app.model.close()
+        app.model = app.load_model()
+
+    results["load_tasks_data"] = measure(reload_data, runs)
+
+    def render():
+        app.render_tasks()
+        root.update_idletasks()
+
+    results["render_tasks"] = measure(render, runs)
+
+    def sweep():
+        for _ in range(30):
+            app.change_date(-1)
+            root.update_idletasks()
+        app.current_date = datetime.date.today()
+
+    results["change_date_sweep_30"] = measure(sweep, runs)
+
+    def calendar_paging():
+        app.open_calendar()
+        root.update_idletasks()
+        for _ in range(12):
+            app._cal_change_month(-1)
+            root.update_idletasks()
+        app.calendar_win.destroy()
+        app.calendar_win = None
+
+    results["open_calendar_page_12"] = measure(calendar_paging, runs)
+
+    def toggle_burst():
+        tasks = app.model.day(datetime.date.today().strftime("%Y-%m-%d"))
+        for i in range(100 if tasks else 0):
+            app.toggle_task(tasks[i % len(tasks)]['id'])
+        root.update_idletasks()
+
+    app.render_tasks()
+    results["toggle_burst_100"] = measure(toggle_burst, runs)
+
+    def queue_toggle():
+        # 每个样本先排进一次改动，计的是把它真正写下去的耗时，而不是空队列的 flush
+        tasks = app.model.day(datetime.date.today().strftime("%Y-%m-%d"))
+        if tasks:
+            app.toggle_task(tasks[0]['id'])
+
+    results["persist_flush"] = measure(lambda _: app.writer.flush(), runs, setup=queue_toggle)
+
+    def config_burst():
+        for _ in range(100):
+            app.save_config()
+
+    results["save_config_burst_100"] = measure(config_burst, runs)
+
+    def resize_drag():
+        # 模拟高回报率鼠标拖右下角：200 个 Motion 事件，合并后只落实最后一帧
+        app.start_resize(Event(x_root=0, y_root=0))
+        for i in range(200):
+            app.do_resize(Event(x_root=i % 40, y_root=i % 40))
+        app.end_resize(None)
+        root.update_idletasks()
+
+    results["resize_drag_200"] = measure(resize_drag, runs)
+    close_all()
+    return results
+
+
+# --- 基线对比 ---
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in sorted(results.items()):
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            print(f"  {name:<26} {current['median_ms']:>10.2f} ms   (无基线)")
+            continue
+        ratio = current["median_ms"] / base["median_ms"] if base["median_ms"] else 1.0
+        flag = "  <-- 退化" if ratio > tolerance else ""
+        print(f"  {name:<26} {current['median_ms']:>10.2f} ms   基线 {base['median_ms']:>9.2f} ms   x{ratio:.2f}{flag}")
+        if ratio > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Focus 性能基准")
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--tasks", type=int, default=10, help="每天的任务数")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", help="与这份基线结果对比")
+    parser.add_argument("--save-baseline", help="把本次结果另存为基线")
+    parser.add_argument("--tolerance", type=float, default=1.25, help="中位数超过基线多少倍算退化")
+    parser.add_argument("--skip-gui", action="store_true")
+    args = parser.parse_args(argv)
+
+    data_dir = tempfile.mkdtemp(prefix="focus_bench_")
+    try:
+        generate(data_dir, args.days, args.tasks)
+        results = bench_storage(data_dir, args.runs)
+        gui_skipped = args.skip_gui
+        if not gui_skipped:
+            try:
+                results.update(bench_gui(data_dir, args.runs))
+            except Exception as e:  # 没有显示环境时 tk.Tk() 会抛 TclError
+                print(f"跳过界面部分：{e}")
+                gui_skipped = True
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        "meta": {"days": args.days, "tasks_per_day": args.tasks, "runs": args.runs, "gui": not gui_skipped,
+                 "python": platform.python_version(), "platform": platform.platform(),
+                 "time": datetime.datetime.now().isoformat(timespec="seconds")},
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+    else:
+        compare(results, {}, args.tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
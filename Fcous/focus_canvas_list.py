@@ -0,0 +1,157 @@
+import bisect
+
+ROW_PAD = 6  # 与控件版每行的 pady 保持一致
+DELETE_W = 28  # 行尾删除按钮的热区宽度
+
+
+class CanvasTaskList:
+    """把一天的任务整个画在列表画布上：每行只是几个图元，点击和悬停按坐标命中。"""
+
+    def __init__(self, app, canvas):
+        self.app = app
+        self.canvas = canvas
+        self.width = canvas.winfo_width() if canvas.winfo_width() > 1 else 355
+        self.rows = []
+        self.tops = []  # 与 rows 一一对应的行顶坐标，用于二分命中
+        self.tasks = []
+        self.hover_idx = None
+        self.last_y = None
+        self._next_id = 0
+        # 控件版的 scroll_frame 窗口图元在画布模式下隐藏不用
+        canvas.itemconfig(app.canvas_window, state='hidden')
+        canvas.bind("<Motion>", self.on_motion)
+        canvas.bind("<Leave>", self.on_leave)
+        canvas.bind("<Button-1>", self.on_click)
+
+    # --- 绘制 ---
+    def render(self, tasks):
+        c = self.canvas
+        c.delete("tasklist")
+        self.rows, self.tops, self.tasks = [], [], tasks
+        self.hover_idx = None
+        self.hover_rect = c.create_rectangle(0, 0, 0, 0, fill=self.app.colors['hover'], width=0,
+                                             state='hidden', tags=("tasklist",))
+        if not tasks:
+            self._draw_empty_hint()
+            return
+        top = 0
+        for task in tasks:
+            row = self._draw_row(task, top)
+            self.rows.append(row)
+            self.tops.append(top)
+            top += row["height"]
+        self._update_scrollregion()
+
+    def _draw_empty_hint(self):
+        c, colors = self.canvas, self.app.colors
+        c.create_text(self.width / 2, 40, text="☕", font=("Segoe UI", 30), anchor='n', tags=("tasklist",))
+        c.create_text(self.width / 2, 100, text="今日无事，保持专注", fill=colors['sub_text'],
+                      font=("Segoe UI", 11), anchor='n', tags=("tasklist",))
+        c.configure(scrollregion=(0, 0, self.width, 0))
+
+    def _draw_row(self, task, top):
+        app, c = self.app, self.canvas
+        tag = f"row{self._next_id}"
+        self._next_id += 1
+        size = max(18, int(app.font_size * 1.4))
+        text_x = size + 10
+        text = c.create_text(text_x, top + ROW_PAD + 2, text=app.task_text(task), anchor='nw', font=app.font_main,
+                             fill=app.colors['sub_text'] if task['done'] else app.colors['fg'],
+                             width=max(50, self.width - text_x - DELETE_W), tags=("tasklist", tag))
+        x0, y0, x1, y1 = c.bbox(text)
+        height = max(size + 4, y1 - y0 + 4) + 2 * ROW_PAD
+        delete = c.create_text(self.width - DELETE_W / 2, top + ROW_PAD, text="×", anchor='n', font=("Arial", 16),
+                               fill=app.colors['bg'], tags=("tasklist", tag))
+        row = {"tag": tag, "id": task['id'], "text": text, "delete": delete, "height": height, "size": size}
+        self._draw_checkbox(row, top, task['done'])
+        return row
+
+    def _draw_checkbox(self, row, top, checked):
+        tag = row["tag"] + "_cb"
+        self.canvas.delete(tag)
+        self.app.draw_checkbox_items(self.canvas, 0, top + ROW_PAD + 2, row["size"], checked,
+                                     tags=("tasklist", row["tag"], tag))
+
+    def _update_scrollregion(self):
+        total = self.tops[-1] + self.rows[-1]["height"] if self.rows else 0
+        self.canvas.configure(scrollregion=(0, 0, self.width, total))
+
+    def resize(self, width):
+        if width == self.width:
+            return
+        # 宽度变化会改变折行，只能整体重排
+        self.width = width
+        self.render(self.tasks)
+
+    # --- 局部更新 ---
+    def row_added(self, task):
+        if not self.rows:
+            self.render(self.tasks)
+            return
+        top = self.tops[-1] + self.rows[-1]["height"]
+        self.rows.append(self._draw_row(task, top))
+        self.tops.append(top)
+        self._update_scrollregion()
+
+    def row_toggled(self, idx, task):
+        row = self.rows[idx]
+        self._draw_checkbox(row, self.tops[idx], task['done'])
+        self.canvas.itemconfig(row["text"], fill=self.app.colors['sub_text'] if task['done'] else self.app.colors['fg'])
+
+    def row_removed(self, idx):
+        row = self.rows.pop(idx)
+        self.tops.pop(idx)
+        self.canvas.delete(row["tag"])
+        if not self.rows:
+            self.render(self.tasks)
+            return
+        h = row["height"]
+        for i in range(idx, len(self.rows)):
+            self.tops[i] -= h
+            self.canvas.move(self.rows[i]["tag"], 0, -h)
+        self._update_scrollregion()
+        self.hover_idx = None
+        self._hover(self.last_y)
+
+    # --- 命中测试 ---
+    def hit(self, y):
+        idx = bisect.bisect_right(self.tops, y) - 1
+        if idx < 0 or y >= self.tops[idx] + self.rows[idx]["height"]:
+            return None
+        return idx
+
+    def on_click(self, event):
+        idx = self.hit(self.canvas.canvasy(event.y))
+        if idx is None:
+            return
+        if event.x >= self.width - DELETE_W:
+            self.app.delete_task(self.rows[idx]["id"], whole_series=bool(event.state & 0x0001))
+        else:
+            self.app.toggle_task(self.rows[idx]["id"])
+
+    def on_motion(self, event):
+        self.last_y = self.canvas.canvasy(event.y)
+        self._hover(self.last_y)
+
+    def on_leave(self, event):
+        self.last_y = None
+        self._hover(None)
+
+    def _hover(self, y):
+        idx = None if y is None else self.hit(y)
+        if idx == self.hover_idx:
+            return
+        c, colors = self.canvas, self.app.colors
+        if self.hover_idx is not None and self.hover_idx < len(self.rows):
+            c.itemconfig(self.rows[self.hover_idx]["delete"], fill=colors['bg'])
+        self.hover_idx = idx
+        if idx is None:
+            c.itemconfig(self.hover_rect, state='hidden')
+            c.configure(cursor="")
+            return
+        top = self.tops[idx]
+        c.coords(self.hover_rect, 0, top, self.width, top + self.rows[idx]["height"])
+        c.itemconfig(self.hover_rect, state='normal')
+        c.tag_lower(self.hover_rect)
+        c.itemconfig(self.rows[idx]["delete"], fill=colors['sub_text'])
+        c.configure(cursor="hand2")
@@ -0,0 +1,150 @@
+"""Focus 命令行：不启动界面直接增查任务，适合脚本批量录入。
+
+用法：
+    python Focus.py add "写周报" "回邮件"            # 加到今天，可用 -d 2026-01-05 / tomorrow 指定日期
+    python Focus.py add -d tomorrow -               # 从标准输入逐行读取任务
+    python Focus.py add "健身 每天"                  # 末尾带“每天”“每月5号”等标记时建成重复规则，同输入框
+    python Focus.py list [-d DATE]
+    python Focus.py done 1 3 [--undo] [-d DATE]     # 序号即 list 输出的编号
+    python Focus.py import tasks.json|tasks.txt     # JSON 同 todo_data.json 格式；文本每行“[日期] 任务”
+
+每条命令只写一次盘。Focus 窗口正在运行时，改动交给它执行，避免两个进程同时写同一份数据。
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+
+from focus_instance import send_to_running
+from focus_model import (CONFIG_FILE_NAME, DATA_FOLDER_NAME, TaskModel, fallback_data_dir, find_app_root,
+                         find_config_dir, open_archive, open_recurrence, open_store, read_config)
+from focus_recur import REPEAT_MARK
+
+LINE_DATE = re.compile(r"^(\d{4}-\d{2}-\d{2})\s+(.+)$")
+
+
+def resolve_data_dir():
+    """与界面相同的查找顺序：软件目录下的 data，其次我的文档，配置里另设了位置就以配置为准。"""
+    for base in (os.path.join(find_app_root(), DATA_FOLDER_NAME), fallback_data_dir()):
+        config = read_config(os.path.join(base, CONFIG_FILE_NAME))
+        if config is not None:
+            saved = config.get("data_dir", "")
+            return (saved if saved and os.path.exists(saved) else base), config.get("storage", "json")
+    return os.path.join(find_app_root(), DATA_FOLDER_NAME), "json"
+
+
+def parse_date(value):
+    today = datetime.date.today()
+    named = {"today": 0, "tomorrow": 1, "yesterday": -1}
+    if value in named:
+        return (today + datetime.timedelta(days=named[value])).strftime("%Y-%m-%d")
+    return datetime.datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+
+def read_import(path, default_date):
+    if path.lower().endswith(".json"):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        ops = []
+        for k, tasks in sorted(data.items()):
+            k = parse_date(k)
+            for task in tasks:
+                if isinstance(task, str):
+                    task = {"text": task}
+                ops.append({"op": "add", "date": k, "text": task["text"], "done": bool(task.get("done"))})
+        return ops
+    with open(path, "r", encoding="utf-8") as f:
+        return [line_op(line, default_date) for line in f if line.strip()]
+
+
+def line_op(line, default_date):
+    line = line.strip()
+    m = LINE_DATE.match(line)
+    if m:
+        return {"op": "add", "date": m.group(1), "text": m.group(2).strip()}
+    return {"op": "add", "date": default_date, "text": line}
+
+
+def open_model(data_dir, backend):
+    # 带上重复规则和归档，编号才和界面里看到的一致
+    return TaskModel(open_store(data_dir, backend), open_recurrence(data_dir), open_archive(data_dir))
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="Focus.py", description="Focus 命令行")
+    parser.add_argument("--data-dir", help="数据目录，默认与界面相同")
+    sub = parser.add_subparsers(dest="command", required=True)
+    date_arg = {"type": parse_date, "default": "today", "help": "YYYY-MM-DD / today / tomorrow / yesterday"}
+
+    p = sub.add_parser("add", help="添加任务")
+    p.add_argument("-d", "--date", **date_arg)
+    p.add_argument("texts", nargs="+", help="任务内容，- 表示从标准输入逐行读取")
+
+    p = sub.add_parser("list", help="列出某天的任务")
+    p.add_argument("-d", "--date", **date_arg)
+
+    p = sub.add_parser("done", help="按编号标记完成")
+    p.add_argument("-d", "--date", **date_arg)
+    p.add_argument("--undo", action="store_true", help="改回未完成")
+    p.add_argument("numbers", nargs="+", type=int)
+
+    p = sub.add_parser("import", help="从 JSON 或文本文件批量导入")
+    p.add_argument("-d", "--date", **date_arg)
+    p.add_argument("file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    data_dir, backend = resolve_data_dir()
+    if args.data_dir:
+        data_dir = args.data_dir
+    try:
+        return run(args, data_dir, backend)
+    except ValueError as e:
+        # 数据文件连同备份都读不出来，或旧版单文件迁移失败：原文件都保留着，不当作空数据继续写
+        print(f"数据文件损坏：{e}", file=sys.stderr)
+        return 1
+    except OSError as e:
+        # 文件暂时打不开（被其他程序锁住等），不按损坏处理
+        print(f"数据文件无法读取：{e}", file=sys.stderr)
+        return 1
+
+
+def run(args, data_dir, backend):
+    if args.command == "list":
+        model = open_model(data_dir, backend)
+        for n, task in enumerate(model.day(args.date), 1):
+            mark = REPEAT_MARK if 'rule' in task else ""
+            print(f"{n:>3}. [{'x' if task['done'] else ' '}] {mark}{task['text']}")
+        model.close()
+        return 0
+
+    if args.command == "add":
+        texts = [line.strip() for line in sys.stdin] if args.texts == ["-"] else args.texts
+        ops = [{"op": "add", "date": args.date, "text": t} for t in texts if t.strip()]
+    elif args.command == "done":
+        ops = [{"op": "done", "date": args.date, "idx": n - 1, "done": not args.undo} for n in args.numbers]
+    else:
+        ops = read_import(args.file, args.date)
+    if not ops:
+        return 0
+
+    # 指定了别的数据目录时不打扰正在运行的窗口
+    if not args.data_dir and send_to_running({"cmd": "ops", "ops": ops}, find_config_dir()):
+        print(f"已交给正在运行的 Focus：{len(ops)} 项")
+        return 0
+
+    os.makedirs(data_dir, exist_ok=True)
+    model = open_model(data_dir, backend)
+    with model.batch():
+        touched, skipped = model.apply_ops(ops)
+    model.close()
+    print(f"完成 {len(ops) - skipped} 项，涉及 {len(touched)} 天" + (f"，跳过 {skipped} 项（编号不存在）" if skipped else ""))
+    return 1 if skipped else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import heapq
+
+
+def count_tasks(tasks):
+    return len(tasks), sum(1 for t in tasks if t.get("done"))
+
+
+class DayStatsIndex:
+    """日期 -> [总数, 已完成数]。启动时一次建好，之后随增删改增量维护，按天查询是 O(1)。"""
+
+    def __init__(self, counts=None):
+        self.days = {k: [total, done] for k, (total, done) in (counts or {}).items() if total}
+
+    def update(self, tasks_data):
+        for k, tasks in tasks_data.items():
+            total, done = count_tasks(tasks)
+            if total:
+                self.days[k] = [total, done]
+            else:
+                self.days.pop(k, None)
+
+    # --- 查询 ---
+    def get(self, date_key):
+        total, done = self.days.get(date_key, (0, 0))
+        return total, done
+
+    def open_count(self, date_key):
+        total, done = self.get(date_key)
+        return total - done
+
+    def month(self, year, month):
+        total = done = 0
+        for day in range(1, 32):
+            t, d = self.get(f"{year:04d}-{month:02d}-{day:02d}")
+            total += t
+            done += d
+        return total, done
+
+    # --- 增量维护 ---
+    def on_add(self, date_key, task):
+        entry = self.days.setdefault(date_key, [0, 0])
+        entry[0] += 1
+        if task.get("done"):
+            entry[1] += 1
+
+    def on_toggle(self, date_key, done):
+        self.days[date_key][1] += 1 if done else -1
+
+    def on_delete(self, date_key, task):
+        entry = self.days[date_key]
+        entry[0] -= 1
+        if task.get("done"):
+            entry[1] -= 1
+        if not entry[0]:
+            del self.days[date_key]
+
+
+# --- 全文搜索 ---
+def tokenize(text):
+    # 中文没有空格分词，统一按单字 + 相邻二字切分；英文同样适用，最终靠子串校验保证准确
+    text = text.lower()
+    grams = {ch for ch in text if not ch.isspace()}
+    grams.update(text[i:i + 2] for i in range(len(text) - 1) if not (text[i].isspace() or text[i + 1].isspace()))
+    return grams
+
+
+class SearchIndex:
+    """任务文本的倒排索引。posting 表只追加文档编号，删除时整天重建并把旧编号作废。"""
+
+    def __init__(self):
+        self.docs = []  # 文档编号 -> (日期, 当天下标, 原文, 小写文本)，作废的为 None
+        self.postings = {}
+        self.day_docs = {}
+        self.dead = 0
+
+    @classmethod
+    def build(cls, tasks_data):
+        index = cls()
+        for k in sorted(tasks_data):
+            for idx, task in enumerate(tasks_data[k]):
+                index.add(k, idx, task['text'])
+        return index
+
+    def add(self, date_key, idx, text):
+        doc_id = len(self.docs)
+        lowered = text.lower()
+        self.docs.append((date_key, idx, text, text if lowered == text else lowered))
+        self.day_docs.setdefault(date_key, []).append(doc_id)
+        for gram in tokenize(text):
+            self.postings.setdefault(gram, []).append(doc_id)
+
+    def reindex_day(self, date_key, tasks):
+        for doc_id in self.day_docs.pop(date_key, []):
+            self.docs[doc_id] = None
+            self.dead += 1
+        for idx, task in enumerate(tasks):
+            self.add(date_key, idx, task['text'])
+        if self.dead > len(self.docs) // 2:
+            self._compact()
+
+    def _compact(self):
+        live = [doc for doc in self.docs if doc is not None]
+        self.__init__()
+        for date_key, idx, text, _ in live:
+            self.add(date_key, idx, text)
+
+    def search(self, query, limit=50):
+        """返回 [(日期, 下标, 文本)]，日期越近越靠前。"""
+        query = query.strip().lower()
+        grams = tokenize(query)
+        if not grams:
+            return []
+        # 只遍历最稀有那个切片的 posting 表，再用子串匹配过滤
+        candidates = min((self.postings.get(g, []) for g in grams), key=len)
+        hits = (doc[:3] for doc in map(self.docs.__getitem__, reversed(candidates))
+                if doc is not None and query in doc[3])
+        # reindex_day 把改过的那天追加到末尾，编号不再严格按日期排，只取最近的 limit 条而不整表排序
+        return heapq.nlargest(limit, hits, key=lambda hit: hit[0])
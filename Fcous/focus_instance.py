@@ -0,0 +1,134 @@
+import getpass
+import hmac
+import json
+import os
+import queue
+import secrets
+import socket
+import threading
+import zlib
+
+INSTANCE_HOST = "127.0.0.1"
+PORT_BASE, PORT_SPAN = 47615, 8000  # 按用户名在这段端口里错开
+HELLO = "focus/1"  # 握手标记，用来确认端口另一头确实是 Focus
+CONNECT_TIMEOUT = 0.5
+TOKEN_FILE_NAME = "instance_token"  # 主实例每次启动生成的口令，放在数据目录里，只有本用户读得到
+
+
+def user_port():
+    """同一台机器上每个用户一个端口，别的用户的实例不会收到自己的命令。"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = os.path.expanduser("~")
+    return PORT_BASE + zlib.crc32(user.encode("utf-8")) % PORT_SPAN
+
+
+INSTANCE_PORT = int(os.environ.get("FOCUS_PORT", 0)) or user_port()  # 端口冲突时可用环境变量换一个
+
+
+def read_token(token_dir):
+    try:
+        with open(os.path.join(token_dir, TOKEN_FILE_NAME), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def write_token(token_dir, token):
+    path = os.path.join(token_dir, TOKEN_FILE_NAME)
+    os.makedirs(token_dir, exist_ok=True)
+    # 先建好只有本用户可读的临时文件再换上去，任何时候都读不到半截口令
+    fd = os.open(path + ".tmp", os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(token)
+    os.replace(path + ".tmp", path)
+
+
+def send_to_running(message, token_dir, port=INSTANCE_PORT):
+    """把命令交给已经在运行的实例。成功返回 True；没有实例、口令对不上或端口被别的程序占用时返回 False。"""
+    token = read_token(token_dir)
+    if not token:
+        return False
+    try:
+        with socket.create_connection((INSTANCE_HOST, port), timeout=CONNECT_TIMEOUT) as conn:
+            payload = dict(message, hello=HELLO, token=token)
+            conn.sendall((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+            reply = conn.makefile("r", encoding="utf-8").readline()
+    except OSError:
+        return False
+    return reply.strip() == "ok"
+
+
+class InstanceServer:
+    """常驻实例的本地监听端口。收到的命令只进队列，由 Tk 主线程定时取出执行。
+
+    绑定成功后生成新口令写进 token_dir，只执行带着这个口令的命令。
+    """
+
+    def __init__(self, token_dir, port=INSTANCE_PORT):
+        self.messages = queue.Queue()
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+            # Windows 默认允许别的进程抢占同一端口，这里显式独占
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+        try:
+            self.sock.bind((INSTANCE_HOST, port))  # 端口已被占用时抛 OSError，调用方据此判断已有实例
+            # 绑定成功才写口令，免得覆盖正在运行的实例的口令
+            self.token = secrets.token_hex(16)
+            write_token(token_dir, self.token)
+            self.sock.listen(5)
+        except OSError:
+            self.sock.close()
+            raise
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return  # close() 之后 accept 会失败，线程随之退出
+            with conn:
+                try:
+                    conn.settimeout(2)
+                    message = json.loads(conn.makefile("r", encoding="utf-8").readline())
+                    if not isinstance(message, dict) or message.get("hello") != HELLO:
+                        continue
+                    if not hmac.compare_digest(str(message.get("token", "")), self.token):
+                        continue
+                    self.messages.put(message)
+                    conn.sendall(b"ok\n")
+                except (OSError, ValueError):
+                    pass
+
+    def poll(self):
+        """在 Tk 主线程里调用，取出目前积压的所有命令。"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        # 只 close 不会唤醒阻塞在 accept 里的线程（Linux），先 shutdown 让它立即返回
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def start_or_forward(message, token_dir, port=INSTANCE_PORT):
+    """先尝试把命令交给已有实例；没有的话自己成为主实例。
+
+    返回 (已转发, server)。两个进程同时启动时只有一个能绑定端口，另一个再转发一次。
+    端口被无关程序占用、或口令写不进 token_dir 时 server 为 None，照常单独运行，命令由调用方自己执行。
+    """
+    if send_to_running(message, token_dir, port):
+        return True, None
+    try:
+        return False, InstanceServer(token_dir, port)
+    except OSError:
+        return send_to_running(message, token_dir, port), None
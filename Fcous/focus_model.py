@@ -0,0 +1,531 @@
+import collections
+import contextlib
+import datetime
+import os
+import shutil
+import sys
+
+from focus_archive import TaskArchive
+from focus_index import DayStatsIndex
+from focus_recur import RecurrenceBook, parse_key, parse_repeat
+from focus_storage import (ShardedTaskStore, SqliteTaskStore, migrate_json_to_shards, migrate_json_to_sqlite,
+                           migrate_to_shards, migrate_to_sqlite, read_checked)
+
+# --- 常量定义 ---
+DATA_FOLDER_NAME = "data"
+CONFIG_FILE_NAME = "todo_config.json"
+DATA_FILE_NAME = "todo_data.json"
+DB_FILE_NAME = "todo_data.db"
+RECUR_FILE_NAME = "todo_recurring.json"
+SHARD_DIR_NAME = "months"  # 按月分片的数据目录，每月一个 2026-10.json
+ARCHIVE_DIR_NAME = "archive"  # 归档的旧任务，每年一个 2024.json.gz
+LOAD_WINDOW_DAYS = 31  # 启动时只加载当前日期前后这么多天所在的月份
+UNDO_DEPTH = 100  # 最多能撤销多少步
+
+
+# --- 路径 ---
+def find_app_root():
+    # --- [核心修复] 终极路径判定逻辑 ---
+    # 1. 尝试获取 Nuitka/PyInstaller 的原始路径
+    if getattr(sys, 'frozen', False):
+        # Nuitka/PyInstaller 打包环境
+        # 优先尝试 sys.argv[0]，因为它通常指向启动的 .exe 全路径
+        app_root_path = os.path.dirname(os.path.abspath(sys.argv[0]))
+    else:
+        # 开发环境
+        app_root_path = os.path.dirname(os.path.abspath(__file__))
+
+    # [调试功能] 如果发现路径不对（比如是在 Temp 文件夹），启用备用方案
+    # 很多时候 Temp 文件夹路径包含 "AppData" 或 "Temp"
+    if "AppData" in app_root_path or "Temp" in app_root_path:
+        # 备用方案：尝试使用当前工作目录 (CWD)
+        # 当你双击 exe 时，CWD 通常就是 exe 所在的目录
+        app_root_path = os.getcwd()
+    return app_root_path
+
+
+def fallback_data_dir():
+    # 软件目录不可写时改用【我的文档/Focus_Data】
+    return os.path.join(os.path.expanduser("~"), "Documents", "Focus_Data")
+
+
+def find_config_dir():
+    # 与界面相同的查找顺序：软件目录下的 data，其次我的文档，以已有配置文件的那个为准
+    bases = (os.path.join(find_app_root(), DATA_FOLDER_NAME), fallback_data_dir())
+    for base in bases:
+        if os.path.exists(os.path.join(base, CONFIG_FILE_NAME)):
+            return base
+    return bases[0]
+
+
+def backend_path(data_dir, backend):
+    return os.path.join(data_dir, DB_FILE_NAME if backend == "sqlite" else SHARD_DIR_NAME)
+
+
+def open_store(data_dir, backend="json", writer=None):
+    # 任务只存在一个后端里：这个后端还没有数据时，从另一个后端或旧的单文件搬过来，原来的改名 .bak 留底
+    data_file_path = os.path.join(data_dir, DATA_FILE_NAME)
+    path = backend_path(data_dir, backend)
+    if not os.path.exists(path):
+        other = "json" if backend == "sqlite" else "sqlite"
+        if os.path.exists(backend_path(data_dir, other)):
+            convert_store(data_dir, other, backend)
+        elif os.path.exists(data_file_path) and backend == "sqlite":
+            migrate_json_to_sqlite(data_file_path, path)
+        elif os.path.exists(data_file_path):
+            migrate_json_to_shards(data_file_path, path)
+    if backend == "sqlite":
+        return SqliteTaskStore(path, writer=writer)
+    return ShardedTaskStore(path, writer=writer)
+
+
+def convert_store(data_dir, source, target):
+    """把 source 后端的全部任务搬到 target 后端，核对无误后 source 改名 .bak 留底，返回搬过去的条数。
+
+    切换后端时调用：之后只有 target 在用，不会两边各留一份、各改各的。target 里原有的旧数据同样改名留底。
+    两个后端的存储都要先关掉（写线程里的改动已经落盘）。
+    """
+    source_path, target_path = backend_path(data_dir, source), backend_path(data_dir, target)
+    if not os.path.exists(source_path):
+        return 0
+    if source == "sqlite":
+        store = SqliteTaskStore(source_path)
+        try:
+            data = store.load()
+        finally:
+            store.close()
+    else:
+        data = ShardedTaskStore(source_path).load()
+    if os.path.exists(target_path):
+        retire(target_path)
+    if target == "sqlite":
+        count = migrate_to_sqlite(data, target_path)
+    else:
+        count = migrate_to_shards(data, target_path)
+    retire(source_path)
+    return count
+
+
+def retire(path):
+    # 换下来的数据改名 .bak，只留最近一份；SQLite 残留的 -wal/-shm 跟着改名，免得配错库
+    bak_path = path + ".bak"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.isdir(bak_path + suffix):
+            shutil.rmtree(bak_path + suffix)
+        elif os.path.exists(bak_path + suffix):
+            os.remove(bak_path + suffix)
+        if os.path.exists(path + suffix):
+            os.replace(path + suffix, bak_path + suffix)
+
+
+def open_recurrence(data_dir, writer=None):
+    return RecurrenceBook(os.path.join(data_dir, RECUR_FILE_NAME), writer=writer)
+
+
+def open_archive(data_dir):
+    return TaskArchive(os.path.join(data_dir, ARCHIVE_DIR_NAME))
+
+
+# --- 任务模型 ---
+class TaskModel:
+    """不依赖 Tk 的任务数据层：按月懒加载，增删改同时维护存储和每日统计。界面和命令行共用。
+
+    某天第一次被 day() 取到时，才把当天已归档的任务和重复任务依次放到列表开头；
+    这些条目只在内存里，下标换算成存储下标时要减去 front(日期)。
+    增删改都按任务编号（当天唯一的 "id"）定位，positions 与列表同步维护，查找不用扫描列表。
+    """
+
+    def __init__(self, store, recur=None, archive=None):
+        self.store = store
+        self.recur = recur
+        self.archive = archive
+        self.tasks_data = {}
+        self.loaded_months = set()
+        self.arch_count = {}  # 已展开的日期 -> 列表开头的归档任务条数
+        self.occ_count = {}  # 已展开的日期 -> 紧随其后的重复任务条数
+        self.positions = {}  # 已展开的日期 -> {任务编号: 在列表里的下标}
+        self.next_ids = {}  # 已展开的日期 -> 下一条新任务的编号
+        # 撤销/重做记录：每步只存重做它所需的几个字段，如 ("remove", 日期, 下标, 那条任务)，不拷贝整份数据
+        self.undo_stack = collections.deque(maxlen=UNDO_DEPTH)
+        self.redo_stack = collections.deque(maxlen=UNDO_DEPTH)
+        # 统计索引覆盖全部历史，后端只数条数不解析内容
+        self.day_stats = DayStatsIndex(store.day_stats())
+
+    def load_window(self, center, days=LOAD_WINDOW_DAYS):
+        # 只读 center 附近的月份，其余月份用到时再由 ensure_month_loaded 补读
+        start = center - datetime.timedelta(days=days)
+        end = center + datetime.timedelta(days=days)
+        y, m = start.year, start.month
+        while (y, m) <= (end.year, end.month):
+            self.loaded_months.add((y, m))
+            y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+        self.tasks_data.update(self.store.load_range(start.strftime("%Y-%m-01"), end.strftime("%Y-%m-31")))
+
+    def ensure_month_loaded(self, year, month):
+        if (year, month) in self.loaded_months:
+            return
+        self.tasks_data.update(self.store.load_range(f"{year:04d}-{month:02d}-01", f"{year:04d}-{month:02d}-31"))
+        self.loaded_months.add((year, month))
+
+    def day(self, date_key):
+        self.ensure_month_loaded(int(date_key[:4]), int(date_key[5:7]))
+        # 返回的就是 tasks_data 里的那份列表，渲染层持有它即可看到之后的增删
+        tasks = self.tasks_data.setdefault(date_key, [])
+        if date_key not in self.occ_count:
+            archived = self._archived(date_key)
+            occurrences = self.recur.occurrences(date_key) if self.recur is not None else []
+            tasks[:0] = archived + occurrences
+            self.arch_count[date_key] = len(archived)
+            self.occ_count[date_key] = len(occurrences)
+            self._index(date_key)
+            # 归档任务保留原编号，新编号要避开它们，归档回写时才不会重号
+            self.next_ids[date_key] = max((t['id'] for t in tasks if isinstance(t['id'], int)), default=0) + 1
+        return tasks
+
+    def _index(self, date_key):
+        self.positions[date_key] = {}
+        self._reindex(date_key, 0)
+
+    def _reindex(self, date_key, start):
+        # 从 start 起的下标变了：追加只改一项，中间插入或删除才顺延后面的几项
+        tasks, positions = self.tasks_data[date_key], self.positions[date_key]
+        for i in range(start, len(tasks)):
+            positions[tasks[i]['id']] = i
+
+    def position(self, date_key, task_id):
+        """任务在当天列表里的下标，不存在时返回 None。"""
+        self.day(date_key)
+        return self.positions[date_key].get(task_id)
+
+    def task(self, date_key, task_id):
+        """按编号取当天的任务，不存在时返回 None。"""
+        idx = self.position(date_key, task_id)
+        return None if idx is None else self.tasks_data[date_key][idx]
+
+    def _archived(self, date_key):
+        if self.archive is None or int(date_key[:4]) not in self.archive.years():
+            return []
+        # 旧版本归档的任务没有编号，给一个带 a 前缀的，只在内存里用
+        return [dict(task, archived=True, id=task.get('id', f"a{n}"))
+                for n, task in enumerate(self.archive.day(date_key))]
+
+    def front(self, date_key):
+        return self.arch_count.get(date_key, 0) + self.occ_count.get(date_key, 0)
+
+    # 日历用的统计：day_stats 覆盖全部历史，加上重复任务和归档即可，翻月不读分片、不把任务留在内存里
+    def open_count(self, date_key):
+        total, done = self.recur.counts(date_key) if self.recur is not None else (0, 0)
+        return self.day_stats.open_count(date_key) + total - done
+
+    def month_stats(self, year, month):
+        total, done = self.day_stats.month(year, month)
+        if self.archive is not None and year in self.archive.years():
+            # 归档里都是已完成的任务
+            archived = self.archive.month_counts(year, month)
+            total, done = total + archived, done + archived
+        if self.recur is not None and self.recur.rules:
+            day = datetime.date(year, month, 1)
+            while day.month == month:
+                t, d = self.recur.counts(day.strftime("%Y-%m-%d"))
+                total, done = total + t, done + d
+                day += datetime.timedelta(days=1)
+        return total, done
+
+    def history_loader(self):
+        """返回一个给后台线程调用的函数，读出全部历史，每天的排列与 day() 相同：归档、重复任务、普通任务。
+
+        在调用线程里先拍下重复规则的副本；任务直接读磁盘，本次运行改过、还没落盘的日期由调用方按内存补上。
+        """
+        store, archive = self.store, self.archive
+        recur = self.recur.copy() if self.recur is not None and self.recur.rules else None
+        horizon = datetime.date.today() + datetime.timedelta(days=LOAD_WINDOW_DAYS)
+
+        def load():
+            data = store.scan()
+            archived = archive.load() if archive is not None else {}
+            occurrences = {}
+            if recur is not None:
+                # 重复任务从最早的规则起展开到窗口末尾（或最晚一条普通任务），与翻日期能看到的范围一致
+                day = parse_key(min(rule["start"] for rule in recur.rules.values()))
+                last = max([horizon] + [parse_key(k) for k in data][-1:])
+                while day <= last:
+                    k = day.strftime("%Y-%m-%d")
+                    occurrences[k] = recur.occurrences(k)
+                    day += datetime.timedelta(days=1)
+            return {k: archived.get(k, []) + occurrences.get(k, []) + data.get(k, [])
+                    for k in set(data) | set(archived) | set(occurrences)}
+
+        return load
+
+    # --- 增删改 ---
+    def add(self, date_key, text, done=False):
+        tasks = self.day(date_key)
+        task = {"id": self.next_ids[date_key], "text": text, "done": done}
+        self.next_ids[date_key] += 1
+        self._insert(date_key, len(tasks), task)
+        self._record(("insert", date_key, len(tasks) - 1, task))
+        return task
+
+    def set_done(self, date_key, task_id, done):
+        task = self.task(date_key, task_id)
+        if task['done'] != done and not task.get('archived'):
+            self._set_done(date_key, task_id, done)
+            self._record(("done", date_key, task_id, done))
+        return task
+
+    def toggle(self, date_key, task_id):
+        return self.set_done(date_key, task_id, not self.task(date_key, task_id)['done'])
+
+    def delete(self, date_key, task_id):
+        """删除并返回该任务；归档里的任务只读，返回 None。"""
+        task = self.task(date_key, task_id)
+        if task.get('archived'):
+            return None
+        idx = self.position(date_key, task_id)
+        self._remove(date_key, task_id)
+        self._record(("remove", date_key, idx, task))
+        return task
+
+    def edit(self, date_key, task_id, text):
+        """改写任务文字；重复任务和归档任务不能单独改，返回 None。"""
+        task = self.task(date_key, task_id)
+        if task.get('archived') or 'rule' in task:
+            return None
+        if task['text'] != text:
+            self._record(("edit", date_key, task_id, task['text'], text))
+            self._edit(date_key, task_id, text)
+        return task
+
+    def move(self, date_key, task_id, dst):
+        """把当天一条普通任务挪到 dst 位置，返回被移动的任务。"""
+        tasks, front = self.day(date_key), self.front(date_key)
+        src = self.position(date_key, task_id)
+        if min(src, dst) < front or dst >= len(tasks):
+            return None
+        if src != dst:
+            self._move(date_key, task_id, dst)
+            self._record(("move", date_key, task_id, src, dst))
+        return tasks[dst]
+
+    # 以下几个只改数据、不记撤销，撤销和重做也走这里，存储层照常只收到增量记录
+    def _insert(self, date_key, idx, task):
+        tasks = self.day(date_key)
+        if 'rule' in task:
+            # 撤销单独删掉的那一次：取消跳过，重新展开当天
+            self.recur.unskip(task['rule'], date_key)
+            if task['done']:
+                self.recur.set_done(task['rule'], date_key, True)
+            self._rematerialize()
+            return
+        tasks.insert(idx, task)
+        self._reindex(date_key, idx)
+        self.store.insert(date_key, idx - self.front(date_key), task)
+        self.day_stats.on_add(date_key, task)
+
+    def _remove(self, date_key, task_id):
+        idx = self.positions[date_key].pop(task_id)
+        task = self.tasks_data[date_key].pop(idx)
+        self._reindex(date_key, idx)
+        if 'rule' in task:
+            # 只删这一天的这一次，规则本身保留
+            self.recur.skip(task['rule'], date_key)
+            self.occ_count[date_key] -= 1
+        else:
+            self.store.delete(date_key, task_id)
+            self.day_stats.on_delete(date_key, task)
+        return task
+
+    def _set_done(self, date_key, task_id, done):
+        task = self.task(date_key, task_id)
+        task['done'] = done
+        if 'rule' in task:
+            self.recur.set_done(task['rule'], date_key, done)
+        else:
+            self.store.toggle(date_key, task_id, done)
+            self.day_stats.on_toggle(date_key, done)
+
+    def _edit(self, date_key, task_id, text):
+        self.task(date_key, task_id)['text'] = text
+        self.store.edit(date_key, task_id, text)
+
+    def _move(self, date_key, task_id, dst):
+        tasks, src = self.day(date_key), self.position(date_key, task_id)
+        task = tasks.pop(src)
+        tasks.insert(dst, task)
+        self._reindex(date_key, min(src, dst))
+        self.store.delete(date_key, task_id)
+        self.store.insert(date_key, dst - self.front(date_key), task)
+
+    # --- 撤销 / 重做 ---
+    def _record(self, step):
+        self.undo_stack.append(step)
+        self.redo_stack.clear()
+
+    def undo(self):
+        """撤销最近一步，返回 (这一步所在的日期, 需要刷新的日期集合)；没有可撤销的返回 None。"""
+        if not self.undo_stack:
+            return None
+        step = self.undo_stack.pop()
+        self.redo_stack.append(step)
+        return step[1], self._replay(step, forward=False)
+
+    def redo(self):
+        if not self.redo_stack:
+            return None
+        step = self.redo_stack.pop()
+        self.undo_stack.append(step)
+        return step[1], self._replay(step, forward=True)
+
+    def _replay(self, step, forward):
+        op, k = step[0], step[1]
+        if op == "rule":
+            # 新增或整条删除的规则：("rule", 日期, 规则编号, 删除前的 rule_state, 这一步是否新增)
+            rule_id, state, added = step[2:]
+            self.recur.set_rule_state(rule_id, state if forward == added else (None, (), ()))
+            return self._rematerialize() | {k}
+        if op == "rule_end":
+            # 只改了结束日期：("rule_end", 日期, 规则编号, 原结束日期, 新结束日期)
+            self.recur.set_end(step[2], step[4] if forward else step[3])
+            return self._rematerialize() | {k}
+        if op == "insert" or op == "remove":
+            _, _, idx, task = step
+            if (op == "insert") == forward:
+                self._insert(k, idx, task)
+            else:
+                self._remove(k, task['id'])
+        elif op == "done":
+            self._set_done(k, step[2], step[3] if forward else not step[3])
+        elif op == "edit":
+            self._edit(k, step[2], step[4] if forward else step[3])
+        elif op == "move":
+            self._move(k, step[2], step[4] if forward else step[3])
+        return {k}
+
+    # --- 重复规则 ---
+    def add_rule(self, date_key, text, kind, n):
+        """从 date_key 起新增一条重复规则，返回已展开、需要刷新的日期。"""
+        rule = self.recur.add_rule(text, kind, n, date_key)
+        self._record(("rule", date_key, rule["id"], (dict(rule), (), ()), True))
+        return self._rematerialize()
+
+    def end_rule(self, date_key, task_id):
+        """把这条重复任务从 date_key 起停掉，返回需要刷新的日期。"""
+        rule_id = self.task(date_key, task_id)['rule']
+        end_key = self.recur.rules[rule_id].get("end")
+        removed = self.recur.end_rule(rule_id, date_key)
+        # 撤销记录只存变了的字段；只有整条删掉时才要留下完成、跳过记录，撤销时原样放回
+        if removed is not None:
+            self._record(("rule", date_key, rule_id, removed, False))
+        else:
+            self._record(("rule_end", date_key, rule_id, end_key, self.recur.rules[rule_id]["end"]))
+        return self._rematerialize()
+
+    def _rematerialize(self):
+        # 规则变化只影响已经展开过的日期：换掉列表开头那一段，原列表对象保持不变
+        changed = set()
+        for k, count in self.occ_count.items():
+            tasks, start = self.tasks_data[k], self.arch_count[k]
+            occurrences = self.recur.occurrences(k)
+            if tasks[start:start + count] != occurrences:
+                tasks[start:start + count] = occurrences
+                self.occ_count[k] = len(occurrences)
+                self._index(k)
+                changed.add(k)
+        return changed
+
+    # --- 归档 ---
+    def archive_job(self, before_key):
+        """返回一个给后台线程调用的函数，把 before_key 之前（不含）已完成的任务移进归档。
+
+        它只碰磁盘和存储，返回 ({日期: 剩下的任务}, 移走的条数)，交回调用线程的 finish_archive 更新内存。
+        """
+        store, archive = self.store, self.archive
+        keep_months = {f"{y:04d}-{m:02d}" for y, m in self.loaded_months}
+
+        def job():
+            since_key = archive.until()
+            if since_key >= before_key:
+                return {}, 0
+            if store.writer:
+                store.writer.flush()  # 还没落盘的改动要先写下去，下面直接读文件才读得到
+            data = store.scan(since_key, before_key)
+            data.pop(before_key, None)
+            moved = {k: [t for t in tasks if t.get("done")] for k, tasks in data.items()}
+            moved = {k: tasks for k, tasks in moved.items() if tasks}
+            # 先把归档文件写好，再从在用数据里删除；中途出错时两边暂时各有一份，下次重跑 add 会跳过已归档的编号
+            if moved:
+                archive.add(moved)
+            for k, tasks in moved.items():
+                for task in tasks:
+                    store.delete(k, task["id"])  # 有后台写线程时只是排队，同一个月合并成一次写盘
+            archive.set_until(before_key)
+            # 删除时读进存储的旧月份，写完后放掉，只留界面正在用的
+            store.release(keep_months)
+            kept = {k: [t for t in data[k] if not t.get("done")] for k in moved}
+            return kept, sum(len(tasks) for tasks in moved.values())
+
+        return job
+
+    def finish_archive(self, kept):
+        """在调用线程里应用 archive_job 的结果：已读进内存的日期去掉归档走的任务，每日统计随之更新。"""
+        for k, keep in kept.items():
+            self._after_archive(k, keep)
+        if kept:
+            # 撤销记录里的任务已经进了只读的归档，不能再按原样放回
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+
+    def _after_archive(self, date_key, keep):
+        self.day_stats.update({date_key: keep})
+        tasks = self.tasks_data.get(date_key)
+        if tasks is None:
+            return
+        # 已读进内存的日期就地换成：归档部分 + 重复任务 + 剩下的未完成任务
+        if date_key in self.occ_count:
+            start, count = self.arch_count[date_key], self.occ_count[date_key]
+            archived = self._archived(date_key)
+            tasks[:] = archived + tasks[start:start + count] + [t for t in tasks[start + count:] if not t.get("done")]
+            self.arch_count[date_key] = len(archived)
+            self._index(date_key)
+        else:
+            tasks[:] = [t for t in tasks if not t.get("done")]
+
+    def apply_ops(self, ops):
+        """执行命令行传来的一批操作，返回 (改动过的日期集合, 被跳过的条数)。"""
+        touched, skipped = set(), 0
+        for op in ops:
+            k = op["date"]
+            repeat = parse_repeat(op["text"]) if op["op"] == "add" and self.recur is not None else None
+            if repeat:
+                # 与输入框一致：末尾带“每天”等标记的建成重复规则，已展开的日期随之刷新
+                touched.update(self.add_rule(k, *repeat))
+            elif op["op"] == "add":
+                self.add(k, op["text"], op.get("done", False))
+            elif op["op"] == "done" and 0 <= op["idx"] < len(self.day(k)):
+                # 命令行给的是 list 输出的序号，到这里才换成编号
+                self.set_done(k, self.day(k)[op["idx"]]['id'], op.get("done", True))
+            else:
+                skipped += 1
+                continue
+            touched.add(k)
+        return touched, skipped
+
+    @contextlib.contextmanager
+    def batch(self):
+        """with model.batch(): ... 期间的改动退出时一次写盘。"""
+        with self.store.batch():
+            if self.recur is None:
+                yield self
+                return
+            with self.recur.batch():
+                yield self
+
+    def close(self):
+        self.store.close()
+
+
+def read_config(config_path):
+    try:
+        return read_checked(config_path)
+    except ValueError:
+        return None
@@ -0,0 +1,69 @@
+import collections
+import functools
+import os
+import time
+
+PROFILE_ENV = "FOCUS_PROFILE"  # 设为 1 即开启性能采样，也可以在配置里写 "profile": true
+SAMPLE_WINDOW = 200  # 每个热点保留最近多少次耗时
+HEARTBEAT_MS = 50
+
+
+class HotPathProfiler:
+    """热点计时：只在开启时包装方法，关闭状态下没有任何额外开销。"""
+
+    def __init__(self, window=SAMPLE_WINDOW):
+        self.window = window
+        self.samples = collections.OrderedDict()
+        self.cprofile = None
+
+    def wrap(self, name, fn):
+        samples = self.samples.setdefault(name, collections.deque(maxlen=self.window))
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append((time.perf_counter() - start) * 1000)
+
+        return timed
+
+    def record(self, name, ms):
+        self.samples.setdefault(name, collections.deque(maxlen=self.window)).append(ms)
+
+    def stats(self, name):
+        values = sorted(self.samples.get(name, ()))
+        if not values:
+            return None
+        return values[len(values) // 2], values[min(len(values) - 1, int(len(values) * 0.95))], values[-1]
+
+    def report_lines(self):
+        lines = []
+        for name in self.samples:
+            stats = self.stats(name)
+            if stats:
+                lines.append(f"{name:<16} p50 {stats[0]:6.1f}  p95 {stats[1]:6.1f}  max {stats[2]:6.1f} ms")
+        return lines
+
+    # --- cProfile 快照 ---
+    def toggle_cprofile(self, dump_path):
+        """第一次调用开始记录，第二次调用停止并写出 .pstats 文件，返回写出的路径。
+
+        打包后的窗口程序没有控制台，按累计耗时排的前 20 项另存为同名 .txt，不用 pstats 也能直接打开看。
+        """
+        import cProfile
+        import io
+        import pstats
+        if self.cprofile is None:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+            return None
+        self.cprofile.disable()
+        self.cprofile.dump_stats(dump_path)
+        out = io.StringIO()
+        pstats.Stats(self.cprofile, stream=out).sort_stats("cumulative").print_stats(20)
+        with open(os.path.splitext(dump_path)[0] + ".txt", "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
+        self.cprofile = None
+        return dump_path
@@ -0,0 +1,174 @@
+import datetime
+import re
+
+from focus_storage import DeferredWrites, read_checked, write_json_atomic
+
+KINDS = ("daily", "weekdays", "every", "monthly")  # every: 每 n 天；monthly: 每月 n 号（小月取月底）
+# 输入框里写在任务末尾的重复标记，例如 “健身 每天”、“交房租 每月5号”
+REPEAT_SUFFIX = re.compile(r"^(.+?)\s+(?:(每天|每日)|(每个工作日|工作日)|每(\d+)天|每月(\d+)[号日])$")
+REPEAT_MARK = "↻ "
+
+
+def parse_repeat(text):
+    """解析输入末尾的重复标记，返回 (文本, 类型, n)；没有标记时返回 None。"""
+    m = REPEAT_SUFFIX.match(text.strip())
+    if not m:
+        return None
+    title, daily, weekdays, every, monthly = m.groups()
+    if daily:
+        return title, "daily", 1
+    if weekdays:
+        return title, "weekdays", 1
+    if every:
+        return (title, "every", int(every)) if int(every) > 0 else None
+    return (title, "monthly", int(monthly)) if 1 <= int(monthly) <= 31 else None
+
+
+def parse_key(date_key):
+    return datetime.date(int(date_key[:4]), int(date_key[5:7]), int(date_key[8:10]))
+
+
+def rule_matches(rule, day):
+    date_key = day.strftime("%Y-%m-%d")
+    if date_key < rule["start"] or (rule.get("end") and date_key > rule["end"]):
+        return False
+    kind, n = rule["kind"], rule.get("n", 1)
+    if kind == "daily":
+        return True
+    if kind == "weekdays":
+        return day.weekday() < 5
+    if kind == "every":
+        return (day - parse_key(rule["start"])).days % n == 0
+    if kind == "monthly":
+        next_month = (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+        return day.day == min(n, (next_month - datetime.timedelta(days=1)).day)
+    return False
+
+
+class RecurrenceBook(DeferredWrites):
+    """重复任务规则。规则只存一份，某天被用到时才展开成当天的任务；
+    完成和单独删除都按 (规则, 日期) 稀疏记录，不往任务数据里写任何展开结果。"""
+
+    def __init__(self, path, writer=None):
+        self.path = path
+        self.writer = writer
+        self.rules = {}  # 规则编号 -> 规则
+        self.done = {}  # 规则编号 -> 已完成的日期集合
+        self.skipped = {}  # 规则编号 -> 单独删掉的日期集合
+        self.next_id = 1
+        self._payload = None
+        # 最新一份损坏时自动退回上一版；所有版本都坏了时抛 ValueError，不能拿空规则顶上，否则第一次保存就覆盖掉它们
+        data = read_checked(path)
+        if data is None:
+            return
+        self.next_id = data.get("next_id", 1)
+        for rule in data.get("rules", []):
+            self.rules[rule["id"]] = rule
+        for attr in ("done", "skipped"):
+            setattr(self, attr, {int(rid): set(keys) for rid, keys in data.get(attr, {}).items()})
+
+    # --- 查询 ---
+    def active(self, date_key):
+        day = parse_key(date_key)
+        return [rule for rule in self.rules.values()
+                if rule_matches(rule, day) and date_key not in self.skipped.get(rule["id"], ())]
+
+    def occurrences(self, date_key):
+        # 展开出来的任务编号带 r 前缀，不会和当天普通任务的数字编号冲突
+        return [{"id": f"r{rule['id']}", "text": rule["text"], "done": date_key in self.done.get(rule["id"], ()),
+                 "rule": rule["id"]} for rule in self.active(date_key)]
+
+    def counts(self, date_key):
+        if not self.rules:
+            return 0, 0
+        rules = self.active(date_key)
+        return len(rules), sum(1 for rule in rules if date_key in self.done.get(rule["id"], ()))
+
+    def copy(self):
+        """只含规则和完成、跳过记录的副本，给后台线程展开用，不会写盘。"""
+        book = RecurrenceBook.__new__(RecurrenceBook)
+        book.rules = {rid: dict(rule) for rid, rule in self.rules.items()}
+        book.done = {rid: set(keys) for rid, keys in self.done.items()}
+        book.skipped = {rid: set(keys) for rid, keys in self.skipped.items()}
+        return book
+
+    # --- 修改 ---
+    def add_rule(self, text, kind, n, start_key):
+        rule = {"id": self.next_id, "text": text, "kind": kind, "n": n, "start": start_key}
+        self.next_id += 1
+        self.rules[rule["id"]] = rule
+        self.save()
+        return rule
+
+    def end_rule(self, rule_id, date_key):
+        """从 date_key 这天起不再出现，之前的记录保留。
+
+        从第一天起就停掉等于整条删除，这时返回删除前的 rule_state 供撤销；只改结束日期时返回 None。
+        """
+        rule = self.rules[rule_id]
+        removed = None
+        if date_key <= rule["start"]:
+            removed = self.rule_state(rule_id)
+            del self.rules[rule_id]
+            self.done.pop(rule_id, None)
+            self.skipped.pop(rule_id, None)
+        else:
+            rule["end"] = (parse_key(date_key) - datetime.timedelta(days=1)).strftime("%Y-%m-%d")
+        self.save()
+        return removed
+
+    def set_end(self, rule_id, end_key):
+        # 撤销、重做结束日期；end_key 为 None 表示不再有结束日期
+        rule = self.rules[rule_id]
+        if end_key is None:
+            rule.pop("end", None)
+        else:
+            rule["end"] = end_key
+        self.save()
+
+    def set_done(self, rule_id, date_key, done):
+        keys = self.done.setdefault(rule_id, set())
+        if done:
+            keys.add(date_key)
+        else:
+            keys.discard(date_key)
+        self.save()
+
+    def skip(self, rule_id, date_key):
+        self.skipped.setdefault(rule_id, set()).add(date_key)
+        self.done.get(rule_id, set()).discard(date_key)
+        self.save()
+
+    def unskip(self, rule_id, date_key):
+        self.skipped.get(rule_id, set()).discard(date_key)
+        self.save()
+
+    # --- 撤销 ---
+    def rule_state(self, rule_id):
+        """一条规则连同它的完成、跳过记录的副本；规则不存在时 rule 为 None。"""
+        rule = self.rules.get(rule_id)
+        return (dict(rule) if rule else None, set(self.done.get(rule_id, ())),
+                set(self.skipped.get(rule_id, ())))
+
+    def set_rule_state(self, rule_id, state):
+        rule, done, skipped = state
+        if rule is None:
+            self.rules.pop(rule_id, None)
+        else:
+            self.rules[rule_id] = dict(rule)
+        self.done[rule_id], self.skipped[rule_id] = set(done), set(skipped)
+        self.save()
+
+    # --- 写盘 ---
+    def save(self):
+        # 在主线程里拍一份快照，写线程只管落盘，连续改动只写最后一份
+        self._payload = {
+            "next_id": self.next_id,
+            "rules": [dict(rule) for rule in self.rules.values()],
+            "done": {str(rid): sorted(keys) for rid, keys in self.done.items() if keys},
+            "skipped": {str(rid): sorted(keys) for rid, keys in self.skipped.items() if keys},
+        }
+        self._schedule(self._write)
+
+    def _write(self):
+        write_json_atomic(self.path, self._payload)
@@ -0,0 +1,787 @@
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+import zlib
+
+from focus_index import count_tasks
+
+# --- 常量定义 ---
+JOURNAL_SUFFIX = ".journal"
+SEALED_SUFFIX = ".journal.old"
+SEQ_KEY = "__seq__"  # 旧版快照中记录已合并到的日志序号
+WRITE_DELAY = 0.3  # 最后一次改动之后静默多久再写盘
+WRITE_MAX_DELAY = 2.0  # 连续不断的改动（比如拖动滑块）最多攒这么久就必须写一次
+CHECKSUM_KEY = "__crc32__"  # 写在 JSON 最后一行的校验和，文件仍是合法 JSON
+SNAPSHOT_KEEP = 3  # 每个数据文件另外保留的旧版本数：2026-10.json.1（上一版）… .3
+SHARD_JOURNAL_NAME = "changes.journal"  # 分片目录里的追加日志，每次点击只追加一行
+COMPACT_THRESHOLD = 500  # 日志累计多少条后合并回各月分片
+
+
+def ensure_ids(tasks):
+    """给旧版本文件里没有编号的任务按顺序补上当天唯一的编号；同一份文件每次补出的结果都一样。"""
+    missing = [task for task in tasks if "id" not in task]
+    if missing:
+        next_id = max((task["id"] for task in tasks if "id" in task), default=0) + 1
+        for task_id, task in enumerate(missing, next_id):
+            task["id"] = task_id
+    return tasks
+
+
+def apply_record(data, rec):
+    """把旧版日志里的一条变更记录重放到 tasks_data 上；旧日志都按下标定位。"""
+    op, k = rec["op"], rec["date"]
+    if op == "add":
+        data.setdefault(k, []).append(rec["task"])
+    elif op == "insert":
+        data.setdefault(k, []).insert(rec["idx"], rec["task"])
+    elif op == "toggle":
+        data[k][rec["idx"]]["done"] = rec["done"]
+    elif op == "edit":
+        data[k][rec["idx"]]["text"] = rec["text"]
+    elif op == "delete":
+        del data[k][rec["idx"]]
+
+
+def read_journal(path):
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                # 断电时最后一行可能只写了一半，直接丢弃
+                continue
+    return records
+
+
+def read_snapshot(path):
+    if not os.path.exists(path):
+        return {}, 0
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    seq = data.pop(SEQ_KEY, 0)
+    return data, seq
+
+
+# --- 落盘安全 ---
+def fsync_file(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def fsync_dir(path):
+    # 让改名本身也落盘；Windows 不能对目录 fsync，NTFS 的改名由日志保证
+    if os.name == "nt":
+        return
+    fd = os.open(path or ".", os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def commit_file(tmp_path, path, keep=SNAPSHOT_KEEP):
+    """tmp_path 已写好并 fsync：旧版本依次顺延为 path.1 … path.keep，再把新文件改名到位。
+
+    任何时刻断电，磁盘上要么是完整的新文件，要么 path 暂缺而 path.1 是完整的上一版。
+    """
+    if keep and os.path.exists(path):
+        for n in range(keep - 1, 0, -1):
+            if os.path.exists(f"{path}.{n}"):
+                os.replace(f"{path}.{n}", f"{path}.{n + 1}")
+        os.replace(path, path + ".1")
+    os.replace(tmp_path, path)
+    fsync_dir(os.path.dirname(path))
+
+
+def remove_generations(path, keep=SNAPSHOT_KEEP):
+    # 从最旧的删起，中途断电也不会只剩旧版本被当成最新
+    for candidate in [f"{path}.{n}" for n in range(keep, 0, -1)] + [path]:
+        if os.path.exists(candidate):
+            os.remove(candidate)
+
+
+def seal_json(body):
+    """body 是去掉结尾 } 的 JSON 对象文本，在最后补上一行校验和再闭合，返回要写盘的字节。"""
+    body = body.encode("utf-8")
+    sep = b"" if body.rstrip() == b"{" else b","
+    return body + sep + b'\n"%s": "%08x"\n}\n' % (CHECKSUM_KEY.encode(), zlib.crc32(body))
+
+
+def unseal_json(raw):
+    """校验并解析 seal_json 写出的字节；没有校验和的旧文件只要能解析就接受。校验失败抛 ValueError。"""
+    head, sep, tail = raw.rpartition(b'\n"%s": "' % CHECKSUM_KEY.encode())
+    if sep:
+        body = head[:-1] if head.endswith(b",") else head
+        # 直接对原始字节算 crc32：9 MB 约 8 毫秒，而 json 解析同一份要 400 多毫秒
+        if tail[:8] != b"%08x" % zlib.crc32(body):
+            raise ValueError("校验和不符")
+    data = json.loads(raw)
+    data.pop(CHECKSUM_KEY, None)
+    return data
+
+
+def load_sealed(path):
+    with open(path, "rb") as f:
+        return unseal_json(f.read())
+
+
+def read_checked(path, load=load_sealed, keep=SNAPSHOT_KEEP):
+    """依次尝试 path、path.1 … 返回第一份完整无损的内容；一份都没有时返回 None。
+
+    最新一份损坏时把它改名为 .corrupt 留着，不让它进入轮换；所有版本都坏了才抛 ValueError。
+    打不开（被杀毒软件、索引服务暂时锁住等）不算损坏，OSError 原样抛出，不能因此退回旧版本。
+    """
+    found = False
+    for n in range(keep + 1):
+        candidate = f"{path}.{n}" if n else path
+        try:
+            data = load(candidate)
+        except FileNotFoundError:
+            continue
+        except (ValueError, EOFError, zlib.error):  # 后两种是 gzip 截断、损坏
+            found = True
+            if n == 0:
+                os.replace(path, path + ".corrupt")
+            continue
+        return data
+    if found:
+        raise ValueError(f"{path} 及其备份均已损坏")
+    return None
+
+
+def write_json_atomic(path, data, keep=SNAPSHOT_KEEP):
+    tmp_path = path + ".tmp"
+    text = json.dumps(data, ensure_ascii=False, indent=2)
+    with open(tmp_path, "wb") as f:
+        f.write(seal_json(text[:-1].rstrip()))
+        fsync_file(f)
+    commit_file(tmp_path, path, keep)
+
+
+def replay(data, records, after_seq):
+    last = after_seq
+    for rec in records:
+        if rec["seq"] <= after_seq:
+            continue
+        try:
+            apply_record(data, rec)
+        except (KeyError, IndexError):
+            pass
+        last = rec["seq"]
+    return last
+
+
+class BackgroundWriter:
+    """后台写盘线程。同一个 key 的任务只保留最新一份，一阵连续改动只落盘一次。"""
+
+    def __init__(self, delay=WRITE_DELAY, max_delay=WRITE_MAX_DELAY):
+        self.delay = delay
+        self.max_delay = max_delay
+        self._jobs = {}
+        self._cond = threading.Condition()
+        self._first = self._due = 0
+        self._busy = False
+        self._flushing = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, key, job):
+        with self._cond:
+            now = time.monotonic()
+            if not self._jobs:
+                self._first = now
+            self._jobs[key] = job
+            self._due = min(now + self.delay, self._first + self.max_delay)
+            self._cond.notify()
+
+    def flush(self):
+        """阻塞到目前排队的写入全部完成，退出程序前调用。"""
+        with self._cond:
+            self._flushing = True
+            self._cond.notify_all()
+            while self._jobs or self._busy:
+                self._cond.wait()
+            self._flushing = False
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                while not self._flushing and time.monotonic() < self._due:
+                    self._cond.wait(self._due - time.monotonic())
+                jobs, self._jobs = self._jobs, {}
+                self._busy = True
+            for job in jobs.values():
+                try:
+                    job()
+                except Exception:
+                    pass
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
+
+
+class DeferredWrites:
+    """写盘调度：有后台写线程就交给它合并，batch() 期间先攒着，否则当场写。"""
+    writer = None
+    _batched = None
+
+    @contextlib.contextmanager
+    def batch(self):
+        """批量操作期间只排队不写盘，退出时每种写入只执行一次（命令行导入等场景）。"""
+        self._batched = {}
+        try:
+            yield self
+        finally:
+            jobs, self._batched = self._batched, None
+            for job in jobs.values():
+                job()
+
+    def _schedule(self, job):
+        # 批量模式下先攒着；有后台写线程就交给它合并执行，否则当场写盘（迁移、脚本等场景）
+        if self._batched is not None:
+            self._batched[job] = job
+        elif self.writer:
+            self.writer.submit(self, job)
+        else:
+            job()
+
+
+class TaskStore(DeferredWrites):
+    """存储后端接口。load_range 读取 [start_key, end_key] 之间的日期，load 读取全部历史。
+
+    每条任务带一个当天唯一的编号 "id"，改动按编号定位；只有插入还需要下标来确定位置。
+    """
+
+    def load(self):
+        return self.load_range("0000-00-00", "9999-99-99")
+
+    def load_range(self, start_key, end_key):
+        raise NotImplementedError
+
+    def scan(self, start_key="0000-00-00", end_key="9999-99-99"):
+        """在后台线程里读出 [start_key, end_key] 的任务：不经过缓存，也不长时间占着写入要用的锁。"""
+        return self.load_range(start_key, end_key)
+
+    def day_stats(self):
+        """返回全部历史的 {日期: (总数, 已完成数)}，各后端尽量不做完整解析。"""
+        return {k: count_tasks(tasks) for k, tasks in self.load().items()}
+
+    def add(self, date_key, task):
+        raise NotImplementedError
+
+    def insert(self, date_key, idx, task):
+        """放回到 idx 位置，撤销删除、调整顺序时用。"""
+        raise NotImplementedError
+
+    def toggle(self, date_key, task_id, done):
+        raise NotImplementedError
+
+    def edit(self, date_key, task_id, text):
+        raise NotImplementedError
+
+    def delete(self, date_key, task_id):
+        raise NotImplementedError
+
+    def release(self, keep_months):
+        """放掉 keep_months（"2026-10" 这样的月份）以外读进内存的数据，只是缓存，用到时会再读。"""
+
+    def close(self):
+        pass
+
+
+# --- 旧版单文件（只读，迁移用） ---
+def read_legacy(path):
+    """读出旧版 todo_data.json 连同未合并的日志，返回 {日期: [任务]}。
+
+    只读不写：不合并日志、不改写快照，迁移之后改名留底的就是用户原来的文件。
+    快照解析失败（比如写到一半断电被截断）时抛 ValueError，迁移随之放弃，原文件原样留着。
+    """
+    try:
+        data, snap_seq = read_snapshot(path)
+    except ValueError as e:
+        raise ValueError(f"{path} 无法解析：{e}") from e
+    replay(data, read_journal(path + SEALED_SUFFIX) + read_journal(path + JOURNAL_SUFFIX), snap_seq)
+    for tasks in data.values():
+        ensure_ids(tasks)
+    return data
+
+
+# --- 按月分片 ---
+def apply_change(month, rec):
+    """把分片日志里的一条记录重放到某个月的数据上；按编号定位，只有插入用下标。编号已不在时跳过。"""
+    op, tasks = rec["op"], month.setdefault(rec["date"], [])
+    if op == "add":
+        tasks.append(dict(rec["task"]))
+    elif op == "insert":
+        tasks.insert(rec["idx"], dict(rec["task"]))
+    else:
+        idx = next((i for i, task in enumerate(tasks) if task["id"] == rec["id"]), None)
+        if idx is None:
+            return
+        if op == "toggle":
+            tasks[idx]["done"] = rec["done"]
+        elif op == "edit":
+            tasks[idx]["text"] = rec["text"]
+        elif op == "delete":
+            del tasks[idx]
+
+
+def read_changes(path):
+    """读出分片日志，按月分组：{"2026-10": [记录, ...]}。"""
+    changes = {}
+    for rec in read_journal(path):
+        changes.setdefault(rec["date"][:7], []).append(rec)
+    return changes
+
+
+def read_shard(path, changes=()):
+    """读出一个月的分片，再重放日志里比分片更新的记录；返回 (该月数据, 分片已合并到的日志序号)。"""
+    month = read_checked(path) or {}
+    seq = month.pop(SEQ_KEY, 0)
+    for tasks in month.values():
+        # 旧文件在内存里补上编号，等这个月下次写盘时一并存下
+        ensure_ids(tasks)
+    for rec in changes:
+        if rec["seq"] > seq:
+            apply_change(month, rec)
+    return month, seq
+
+
+def count_shard(path):
+    """不解析 JSON，直接在分片文本里逐行数出每天的 (总数, 已完成数)。
+
+    分片是一天一行的紧凑 JSON，任务文字里的引号都被转义过，数 "done": 就是条数。
+    """
+    stats = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            key, sep, value = line.partition('":')
+            if sep and key.startswith('"') and key[1:] not in (CHECKSUM_KEY, SEQ_KEY):
+                stats[key[1:]] = (value.count('"done":'), value.count('"done":true'))
+    return stats
+
+
+def write_shard(path, month_data, seq=0):
+    # 一天一行的紧凑 JSON（与旧版快照同样的排版），其后是已合并到的日志序号，最后一行是校验和
+    tmp_path = path + ".tmp"
+    lines = ["\n" + json.dumps(k, ensure_ascii=False) + ":"
+             + json.dumps(month_data[k], ensure_ascii=False, separators=(",", ":"))
+             for k in sorted(month_data) if month_data[k]]
+    if seq:
+        lines.append(f'\n"{SEQ_KEY}":{seq}')
+    with open(tmp_path, "wb") as f:
+        f.write(seal_json("{" + ",".join(lines)))
+        fsync_file(f)
+    commit_file(tmp_path, path)
+
+
+class ShardedTaskStore(TaskStore):
+    """每月一个紧凑 JSON 文件（months/2026-10.json），外加一份追加日志 months/changes.journal。
+
+    每次点击只往日志追加一行（由后台写线程攒批写入）；日志攒够 COMPACT_THRESHOLD 条，
+    才把改过的月份整份重写、清空日志。每个分片记下自己已合并到的日志序号，读取时只重放比它新的记录，
+    合并中途断电也不会重复。只读用到的月份，启动开销只和最近的改动条数有关。
+    """
+
+    def __init__(self, shard_dir, writer=None, compact_threshold=COMPACT_THRESHOLD):
+        self.writer = writer
+        self.shard_dir = shard_dir
+        self.journal_path = os.path.join(shard_dir, SHARD_JOURNAL_NAME)
+        self.compact_threshold = compact_threshold
+        self._months = {}  # "2026-10" -> 该月数据，已读入的月份以这里为准
+        self._positions = {}  # 日期 -> {任务编号: 下标}，某天第一次按编号改动时建立，之后随增删维护
+        self._dirty = set()  # 日志里有、分片里还没有的月份，合并时重写
+        self._changes = None  # 打开时日志里已有的记录，按月分组，读入对应月份时重放
+        self._buffer = []  # 还没写进日志的记录行
+        self._pending = 0  # 日志里的记录条数
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    def _path(self, month_key):
+        return os.path.join(self.shard_dir, month_key + ".json")
+
+    def _open(self):
+        # 调用方持有 _lock。上次没合并的日志读进来，涉及的月份等下次合并时一并重写
+        if self._changes is None:
+            self._changes = read_changes(self.journal_path)
+            records = [rec for recs in self._changes.values() for rec in recs]
+            self._pending = len(records)
+            self.seq = max((rec["seq"] for rec in records), default=0)
+            self._dirty.update(self._changes)
+
+    def _month(self, month_key):
+        # 调用方持有 _lock
+        self._open()
+        if month_key not in self._months:
+            month, seq = read_shard(self._path(month_key), self._changes.get(month_key, ()))
+            # 日志丢了的话序号会从头数，这里保证新记录的序号总比该月分片里记下的大
+            self.seq = max(self.seq, seq)
+            self._months[month_key] = month
+        return self._months[month_key]
+
+    # --- 读取 ---
+    def month_keys(self):
+        if not os.path.isdir(self.shard_dir):
+            return []
+        # 只剩 .json.1 的月份是改名途中断了电，读取时会回退到这份
+        return sorted({name[:7] for name in os.listdir(self.shard_dir) if name[7:] in (".json", ".json.1")})
+
+    def load_range(self, start_key, end_key):
+        data = {}
+        with self._lock:
+            self._open()
+            for month_key in sorted(set(self.month_keys()) | set(self._months) | set(self._changes)):
+                if not start_key[:7] <= month_key <= end_key[:7]:
+                    continue
+                for k, tasks in self._month(month_key).items():
+                    if start_key <= k <= end_key and tasks:
+                        # 交出去的是副本，调用方自己增删不会碰到这里的数据
+                        data[k] = [dict(t) for t in tasks]
+        return data
+
+    def scan(self, start_key="0000-00-00", end_key="9999-99-99"):
+        # 直接读文件，不拿 _lock、不进 _months：界面线程上的改动不必等它，读过的月份也不会一直占着内存。
+        # 先读日志再读分片：中间赶上合并的话，分片里记的序号会让已合并的记录被跳过，不会漏也不会重
+        changes = read_changes(self.journal_path)
+        data = {}
+        for month_key in sorted(set(self.month_keys()) | set(changes)):
+            if not start_key[:7] <= month_key <= end_key[:7]:
+                continue
+            try:
+                month, _ = read_shard(self._path(month_key), changes.get(month_key, ()))
+            except ValueError:
+                continue  # 连同备份都坏了的月份跳过，界面读到它时会报错
+            data.update((k, tasks) for k, tasks in month.items() if tasks and start_key <= k <= end_key)
+        return data
+
+    def day_stats(self):
+        # 没读进内存、日志里也没有改动的月份只数文本，不解析、也不缓存；其余以内存为准
+        with self._lock:
+            self._open()
+            for month_key in self._dirty:
+                self._month(month_key)
+            loaded = {month_key: {k: count_tasks(v) for k, v in month.items() if v}
+                      for month_key, month in self._months.items()}
+        stats = {}
+        for month_key in self.month_keys():
+            if month_key in loaded:
+                continue
+            path = self._path(month_key)
+            for candidate in (path, path + ".1"):  # 只剩 .1 的月份同 read_checked 一样退回上一版
+                try:
+                    stats.update(count_shard(candidate))
+                    break
+                except (OSError, ValueError):
+                    continue
+        for month_stats in loaded.values():
+            stats.update(month_stats)
+        return stats
+
+    # --- 写入 ---
+    def add(self, date_key, task):
+        with self._editing({"op": "add", "date": date_key, "task": dict(task)}) as tasks:
+            tasks.append(dict(task))
+            self._reindex(date_key, tasks, len(tasks) - 1)
+
+    def insert(self, date_key, idx, task):
+        with self._editing({"op": "insert", "date": date_key, "idx": idx, "task": dict(task)}) as tasks:
+            tasks.insert(idx, dict(task))
+            self._reindex(date_key, tasks, idx)
+
+    def toggle(self, date_key, task_id, done):
+        with self._editing({"op": "toggle", "date": date_key, "id": task_id, "done": done}) as tasks:
+            tasks[self._position(date_key, tasks, task_id)]["done"] = done
+
+    def edit(self, date_key, task_id, text):
+        with self._editing({"op": "edit", "date": date_key, "id": task_id, "text": text}) as tasks:
+            tasks[self._position(date_key, tasks, task_id)]["text"] = text
+
+    def delete(self, date_key, task_id):
+        with self._editing({"op": "delete", "date": date_key, "id": task_id}) as tasks:
+            idx = self._position(date_key, tasks, task_id)
+            del tasks[idx]
+            del self._positions[date_key][task_id]
+            self._reindex(date_key, tasks, idx)
+
+    @contextlib.contextmanager
+    def _editing(self, rec):
+        # 改内存和记日志在同一把锁里，日志的顺序就是改动的顺序
+        date_key = rec["date"]
+        month_key = date_key[:7]
+        with self._lock:
+            try:
+                yield self._month(month_key).setdefault(date_key, [])
+            except KeyError:
+                return  # 编号已经不在了（比如被别处删掉），这次改动作废
+            self.seq += 1
+            rec["seq"] = self.seq
+            self._buffer.append(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._dirty.add(month_key)
+        self._schedule(self._write_journal)
+
+    def _position(self, date_key, tasks, task_id):
+        # 调用方持有 _lock
+        positions = self._positions.get(date_key)
+        if positions is None:
+            positions = self._positions[date_key] = {task["id"]: i for i, task in enumerate(tasks)}
+        return positions[task_id]
+
+    def _reindex(self, date_key, tasks, start):
+        # 从 start 起的下标变了；追加只改一项，中间插入或删除才需要顺延后面的几项
+        positions = self._positions.get(date_key)
+        if positions is not None:
+            for i in range(start, len(tasks)):
+                positions[tasks[i]["id"]] = i
+
+    def _write_journal(self):
+        # 在写线程里执行：攒下的记录一次追加、一次 fsync
+        with self._lock:
+            lines, self._buffer = self._buffer, []
+        self._append(lines)
+        if self._pending >= self.compact_threshold:
+            self.compact()
+
+    def _append(self, lines):
+        if not lines:
+            return
+        os.makedirs(self.shard_dir, exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write("".join(lines))
+            fsync_file(f)
+        self._pending += len(lines)
+
+    def compact(self):
+        """把日志里的改动合并回各月分片，然后删掉日志。写线程里定期调用，也可以在没有写线程时直接调用。"""
+        with self._lock:
+            self._open()
+            # 内存里的月份和还没写进日志的记录在同一把锁里取，二者对应同一个序号
+            lines, self._buffer = self._buffer, []
+            months = {m: {k: [dict(t) for t in v] for k, v in self._month(m).items()} for m in self._dirty}
+            seq, self._dirty, self._changes = self.seq, set(), {}
+        # 先把记录写进日志，分片只写了一半时断电，重放日志也能补齐
+        self._append(lines)
+        for month_key, month_data in months.items():
+            path = self._path(month_key)
+            if any(month_data.values()):
+                write_shard(path, month_data, seq)
+            else:
+                remove_generations(path)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+            fsync_dir(self.shard_dir)
+        self._pending = 0
+
+    def release(self, keep_months):
+        # 排在后台写线程里执行，与合并串行；还没合并进分片的月份留着
+        def drop():
+            with self._lock:
+                for month_key in set(self._months) - set(keep_months) - self._dirty:
+                    del self._months[month_key]
+                for k in [k for k in self._positions if k[:7] not in self._months]:
+                    del self._positions[k]
+
+        if self.writer:
+            self.writer.submit((self, "release"), drop)
+        else:
+            drop()
+
+    def close(self):
+        if self.writer:
+            self.writer.flush()
+
+
+def migrate_json_to_shards(json_path, shard_dir):
+    """把单文件 todo_data.json（含未合并的日志）拆成按月文件，核对无误后旧文件改名为 .bak 留底。"""
+    count = migrate_to_shards(read_legacy(json_path), shard_dir)
+    retire_legacy(json_path)
+    return count
+
+
+def retire_legacy(json_path):
+    # 旧单文件连同日志改名 .bak 留底，之后没人再读写它们
+    for path in (json_path, json_path + JOURNAL_SUFFIX, json_path + SEALED_SUFFIX):
+        if os.path.exists(path):
+            os.replace(path, path + ".bak")
+
+
+def migrate_to_shards(data, shard_dir):
+    """把已读出的全部任务写成按月文件，逐月读回核对后才换到 shard_dir（shard_dir 须不存在）。"""
+    tmp_dir = shard_dir + ".tmp"
+    if os.path.isdir(tmp_dir):
+        for name in os.listdir(tmp_dir):
+            os.remove(os.path.join(tmp_dir, name))
+    os.makedirs(tmp_dir, exist_ok=True)
+    months = {}
+    for k, tasks in data.items():
+        if tasks:
+            months.setdefault(k[:7], {})[k] = tasks
+    for month_key, month_data in months.items():
+        write_shard(os.path.join(tmp_dir, month_key + ".json"), month_data)
+    # 逐月读回核对，有任何出入就放弃迁移，继续用旧文件
+    check = ShardedTaskStore(tmp_dir).load()
+    if check != {k: v for k, v in data.items() if v}:
+        raise ValueError("分片迁移校验失败")
+    os.replace(tmp_dir, shard_dir)
+    return sum(len(tasks) for tasks in data.values())
+
+
+# --- SQLite 后端 ---
+TASK_FIELDS = ("id", "text", "done")
+
+
+def _split_task(task):
+    # id / text / done 单独成列，其余字段原样塞进 extra，保证迁移无损
+    extra = {k: v for k, v in task.items() if k not in TASK_FIELDS}
+    return (task.get("id"), task.get("text", ""), int(bool(task.get("done"))),
+            json.dumps(extra, ensure_ascii=False) if extra else None)
+
+
+def _join_task(tid, text, done, extra):
+    task = {"id": tid, "text": text, "done": bool(done)}
+    if extra:
+        task.update(json.loads(extra))
+    return task
+
+
+class SqliteTaskStore(TaskStore):
+    """按日期建索引的 SQLite 存储：只读需要的日期范围，每次改动是一条语句。"""
+
+    def __init__(self, db_path, writer=None):
+        self.writer = writer
+        self.db_path = db_path
+        # 写入发生在后台写线程里，读取在主线程，靠 _lock 串行化
+        import sqlite3  # 只有启用 SQLite 存储时才需要，冷启动不为它付导入开销
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        create_schema(self.conn)
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def load_range(self, start_key, end_key):
+        data = {}
+        with self._lock:
+            rows = self.conn.execute("SELECT date, tid, text, done, extra FROM tasks WHERE date BETWEEN ? AND ? "
+                                     "ORDER BY date, pos", (start_key, end_key)).fetchall()
+        for k, tid, text, done, extra in rows:
+            data.setdefault(k, []).append(_join_task(tid, text, done, extra))
+        return data
+
+    def scan(self, start_key="0000-00-00", end_key="9999-99-99"):
+        # 另开一个连接：WAL 模式下读和后台写互不等待
+        import sqlite3
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute("SELECT date, tid, text, done, extra FROM tasks WHERE date BETWEEN ? AND ? "
+                                "ORDER BY date, pos", (start_key, end_key)).fetchall()
+        finally:
+            conn.close()
+        data = {}
+        for k, tid, text, done, extra in rows:
+            data.setdefault(k, []).append(_join_task(tid, text, done, extra))
+        return data
+
+    def day_stats(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT date, COUNT(*), SUM(done) FROM tasks GROUP BY date").fetchall()
+        return {k: (total, done) for k, total, done in rows}
+
+    def add(self, date_key, task):
+        self._execute("INSERT INTO tasks (date, pos, tid, text, done, extra) "
+                      "VALUES (?, (SELECT COALESCE(MAX(pos) + 1, 0) FROM tasks WHERE date = ?), ?, ?, ?, ?)",
+                      (date_key, date_key) + _split_task(task))
+
+    def insert(self, date_key, idx, task):
+        self._execute("UPDATE tasks SET pos = pos + 1 WHERE date = ? AND pos >= ?", (date_key, idx))
+        self._execute("INSERT INTO tasks (date, pos, tid, text, done, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                      (date_key, idx) + _split_task(task))
+
+    def toggle(self, date_key, task_id, done):
+        self._execute("UPDATE tasks SET done = ? WHERE date = ? AND tid = ?", (int(done), date_key, task_id))
+
+    def edit(self, date_key, task_id, text):
+        self._execute("UPDATE tasks SET text = ? WHERE date = ? AND tid = ?", (text, date_key, task_id))
+
+    def delete(self, date_key, task_id):
+        # 先把后面的任务往前挪一位，再删掉它本身
+        self._execute("UPDATE tasks SET pos = pos - 1 WHERE date = ? AND pos > "
+                      "(SELECT pos FROM tasks WHERE date = ? AND tid = ?)", (date_key, date_key, task_id))
+        self._execute("DELETE FROM tasks WHERE date = ? AND tid = ?", (date_key, task_id))
+
+    def close(self):
+        if self.writer:
+            self.writer.flush()
+        self.conn.close()
+
+    def _execute(self, sql, params):
+        with self._lock:
+            self._pending.append((sql, params))
+        self._schedule(self._commit_pending)
+
+    def _commit_pending(self):
+        # 一阵连续改动合并成一个事务提交
+        with self._lock, self.conn:
+            statements, self._pending = self._pending, []
+            for sql, params in statements:
+                self.conn.execute(sql, params)
+
+
+def create_schema(conn):
+    conn.execute("CREATE TABLE IF NOT EXISTS tasks ("
+                 "id INTEGER PRIMARY KEY, date TEXT NOT NULL, pos INTEGER NOT NULL, tid INTEGER, "
+                 "text TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0, extra TEXT)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_date ON tasks (date, pos)")
+    if "tid" not in {row[1] for row in conn.execute("PRAGMA table_info(tasks)")}:
+        # 旧库没有任务编号：按当天顺序从 1 编起，和 JSON 文件补编号的结果一致
+        with conn:
+            conn.execute("ALTER TABLE tasks ADD COLUMN tid INTEGER")
+            conn.execute("UPDATE tasks SET tid = pos + 1")
+
+
+def insert_all(conn, data):
+    conn.executemany("INSERT INTO tasks (date, pos, tid, text, done, extra) VALUES (?, ?, ?, ?, ?, ?)",
+                     ((k, pos) + _split_task(task)
+                      for k, tasks in data.items() for pos, task in enumerate(tasks)))
+
+
+def migrate_json_to_sqlite(json_path, db_path):
+    """一次性把 todo_data.json（含未合并的日志）搬进 SQLite，核对无误后旧文件改名为 .bak 留底。"""
+    count = migrate_to_sqlite(read_legacy(json_path), db_path)
+    retire_legacy(json_path)
+    return count
+
+
+def migrate_to_sqlite(data, db_path):
+    """把已读出的全部任务写进新的 SQLite 库，逐日核对后才替换到 db_path。"""
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    import sqlite3
+    conn = sqlite3.connect(tmp_path)
+    try:
+        create_schema(conn)
+        with conn:
+            insert_all(conn, data)
+        # 逐日核对条数和内容，有任何出入就放弃迁移
+        for k, tasks in data.items():
+            rows = conn.execute("SELECT tid, text, done, extra FROM tasks WHERE date = ? ORDER BY pos", (k,))
+            if [_join_task(*row) for row in rows] != [dict(t, done=bool(t.get("done"))) for t in tasks]:
+                raise ValueError(f"迁移校验失败：{k}")
+    finally:
+        conn.close()
+    os.replace(tmp_path, db_path)
+    return sum(len(tasks) for tasks in data.values())
+
+
+if __name__ == "__main__":
+    # 用法：python focus_storage.py <todo_data.json> <todo_data.db>
+    count = migrate_json_to_sqlite(sys.argv[1], sys.argv[2])
+    print(f"已迁移 {count} 条任务")
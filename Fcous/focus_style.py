@@ -0,0 +1,58 @@
+import tkinter.font as tkfont
+
+FONT_FAMILY = "Segoe UI"
+# 字体角色 -> (相对正文字号的倍数, 再加几号, 粗细)，与原先 update_fonts 里的元组一一对应
+FONT_ROLES = {
+    "main": (1, 0, "normal"),
+    "bold": (1, 0, "bold"),
+    "title": (1, 8, "bold"),
+    "ui_small": (0.85, 0, "normal"),
+    "ui_bold": (0.85, 0, "bold"),
+    "path": (0.7, 0, "normal"),
+    "cal_header": (0.8, 0, "bold"),
+    "cal_weekday": (0.65, 0, "normal"),
+    "cal_day": (0.65, 0, "normal"),
+    "cal_day_bold": (0.65, 0, "bold"),
+}
+PRUNE_START = 256  # 登记表超过这么多项时顺手清掉已销毁的控件
+
+
+class StyleRegistry:
+    """控件 -> 颜色角色（THEMES 里的键）的登记表，外加每个字体角色一个共享的 Font 对象。
+
+    换字号只改 Font 对象，用到它的控件和画布文字由 Tk 自动重排；换主题按登记表一次遍历就地改色。
+    """
+
+    def __init__(self, root, colors, font_size):
+        self.colors = colors
+        self.fonts = {name: tkfont.Font(root, family=FONT_FAMILY) for name in FONT_ROLES}
+        self.set_font_size(font_size)
+        self._roles = {}
+        self._prune_at = PRUNE_START
+
+    def set_font_size(self, size):
+        for name, (scale, extra, weight) in FONT_ROLES.items():
+            self.fonts[name].configure(size=int(size * scale) + extra, weight=weight)
+
+    def color(self, value):
+        # "#FFF" 这类写死的颜色原样使用，其余按角色取当前主题的颜色
+        return value if value.startswith("#") else self.colors[value]
+
+    def paint(self, widget, **roles):
+        """按角色给控件上色并登记，例如 paint(lbl, fg='sub_text', bg='bg')；再次 paint 只覆盖给出的选项。"""
+        widget.config(**{option: self.color(value) for option, value in roles.items()})
+        self._roles.setdefault(widget, {}).update(roles)
+        if len(self._roles) > self._prune_at:
+            self._prune()
+        return widget
+
+    def apply(self, colors):
+        self.colors = colors
+        self._prune()
+        for widget, roles in self._roles.items():
+            widget.config(**{option: self.color(value) for option, value in roles.items()})
+
+    def _prune(self):
+        # 弹窗、空列表提示等随时会被销毁，登记表里只留还活着的控件
+        self._roles = {w: roles for w, roles in self._roles.items() if w.winfo_exists()}
+        self._prune_at = max(PRUNE_START, 2 * len(self._roles))
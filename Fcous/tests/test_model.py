@@ -0,0 +1,245 @@
+"""任务模型的回归测试：撤销重做、重复任务与命令行批量操作、归档。存储用按月分片，全部在临时目录里进行，每个用例结束前重新打开核对落盘结果。
+
+运行：python -m unittest discover -s Fcous/tests（或 python -m pytest Fcous/tests）
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from focus_model import TaskModel, open_archive, open_recurrence  # noqa: E402
+from focus_storage import ShardedTaskStore  # noqa: E402
+
+DAY = "2026-10-18"
+NEXT_DAY = "2026-10-19"
+OLD_DAY = "2025-03-01"
+
+
+class ModelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="focus_test_")
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+        self.model = self.open_model()
+
+    def open_model(self):
+        return TaskModel(ShardedTaskStore(os.path.join(self.dir, "months")),
+                         open_recurrence(self.dir), open_archive(self.dir))
+
+    def reopen(self):
+        self.model.close()
+        self.model = self.open_model()
+        return self.model
+
+    def texts(self, date_key=DAY):
+        return [(t["text"], t["done"]) for t in self.model.day(date_key)]
+
+
+# --- 撤销 / 重做 ---
+class UndoRedoTest(ModelTestCase):
+    def add_three(self):
+        return [self.model.add(DAY, text)["id"] for text in ("a", "b", "c")]
+
+    def test_undo_delete_puts_task_back_in_place(self):
+        ids = self.add_three()
+        self.model.delete(DAY, ids[1])
+
+        self.assertEqual(self.model.undo(), (DAY, {DAY}))
+        self.assertEqual(self.texts(), [("a", False), ("b", False), ("c", False)])
+        self.assertEqual(self.model.position(DAY, ids[1]), 1)
+
+        self.model.redo()
+        self.assertEqual(self.texts(), [("a", False), ("c", False)])
+        self.assertIsNone(self.model.position(DAY, ids[1]))
+
+        self.model.undo()
+        self.reopen()
+        self.assertEqual(self.texts(), [("a", False), ("b", False), ("c", False)])
+
+    def test_undo_move_edit_and_done(self):
+        ids = self.add_three()
+        self.model.move(DAY, ids[0], 2)
+        self.model.edit(DAY, ids[1], "B")
+        self.model.toggle(DAY, ids[2])
+        self.assertEqual(self.texts(), [("B", False), ("c", True), ("a", False)])
+
+        for _ in range(3):
+            self.model.undo()
+        self.assertEqual(self.texts(), [("a", False), ("b", False), ("c", False)])
+
+        self.reopen()
+        self.assertEqual(self.texts(), [("a", False), ("b", False), ("c", False)])
+
+    def test_redo_replays_steps_in_order(self):
+        ids = self.add_three()
+        self.model.move(DAY, ids[2], 0)
+        self.model.delete(DAY, ids[0])
+        expected = self.texts()
+        while self.model.undo():
+            pass
+        self.assertEqual(self.texts(), [])
+
+        while self.model.redo():
+            pass
+        self.assertEqual(self.texts(), expected)
+        self.assertEqual([t["id"] for t in self.model.day(DAY)], [ids[2], ids[1]])
+
+        self.reopen()
+        self.assertEqual(self.texts(), expected)
+
+    def test_new_step_clears_redo(self):
+        self.model.add(DAY, "a")
+        self.model.undo()
+        self.model.add(DAY, "b")
+        self.assertIsNone(self.model.redo())
+        self.assertEqual(self.texts(), [("b", False)])
+
+
+# --- 重复任务 ---
+class RecurrenceTest(ModelTestCase):
+    def test_rule_expands_from_start_day(self):
+        self.model.add(DAY, "a")
+        self.model.add_rule(DAY, "健身", "daily", 1)
+
+        self.assertEqual(self.texts("2026-10-17"), [])
+        self.assertEqual(self.texts(), [("健身", False), ("a", False)])
+        self.assertEqual(self.texts(NEXT_DAY), [("健身", False)])
+        self.assertEqual(self.model.front(DAY), 1)
+        self.assertEqual(self.model.open_count(NEXT_DAY), 1)
+
+        self.model.toggle(DAY, self.model.day(DAY)[0]["id"])
+        self.reopen()
+        self.assertEqual(self.texts(), [("健身", True), ("a", False)])
+        self.assertEqual(self.texts(NEXT_DAY), [("健身", False)])
+
+    def test_deleting_one_occurrence_skips_only_that_day(self):
+        self.model.add_rule(DAY, "健身", "daily", 1)
+        task = self.model.day(DAY)[0]
+        self.model.delete(DAY, task["id"])
+
+        self.assertEqual(self.texts(), [])
+        self.assertEqual(self.texts(NEXT_DAY), [("健身", False)])
+        self.model.undo()
+        self.assertEqual(self.texts(), [("健身", False)])
+
+        self.model.redo()
+        self.reopen()
+        self.assertEqual(self.texts(), [])
+        self.assertEqual(self.texts(NEXT_DAY), [("健身", False)])
+
+    def test_end_rule_keeps_earlier_days(self):
+        self.model.add_rule(DAY, "健身", "daily", 1)
+        self.model.day(DAY)
+        changed = self.model.end_rule(NEXT_DAY, self.model.day(NEXT_DAY)[0]["id"])
+
+        self.assertEqual(changed, {NEXT_DAY})
+        self.assertEqual(self.texts(), [("健身", False)])
+        self.assertEqual(self.texts(NEXT_DAY), [])
+        self.model.undo()
+        self.assertEqual(self.texts(NEXT_DAY), [("健身", False)])
+
+        self.model.redo()
+        self.reopen()
+        self.assertEqual(self.texts(), [("健身", False)])
+        self.assertEqual(self.texts(NEXT_DAY), [])
+
+    def test_end_rule_on_start_day_removes_it_and_undo_restores_records(self):
+        self.model.add_rule(DAY, "健身", "daily", 1)
+        self.model.toggle(DAY, self.model.day(DAY)[0]["id"])
+        self.model.end_rule(DAY, self.model.day(DAY)[0]["id"])
+
+        self.assertEqual(self.model.recur.rules, {})
+        self.assertEqual(self.texts(), [])
+        self.model.undo()
+        self.assertEqual(self.texts(), [("健身", True)])
+
+        self.reopen()
+        self.assertEqual(self.texts(), [("健身", True)])
+
+
+# --- 命令行批量操作 ---
+class ApplyOpsTest(ModelTestCase):
+    def test_add_done_and_repeat_suffix(self):
+        touched, skipped = self.model.apply_ops([
+            {"op": "add", "date": DAY, "text": "a"},
+            {"op": "add", "date": DAY, "text": "健身 每天"},
+            {"op": "done", "date": DAY, "idx": 1},
+            {"op": "done", "date": DAY, "idx": 9},
+        ])
+
+        self.assertEqual((touched, skipped), ({DAY}, 1))
+        # 序号按 list 的输出算，重复任务排在前面
+        self.assertEqual(self.texts(), [("健身", False), ("a", True)])
+        self.assertEqual(len(self.model.recur.rules), 1)
+
+        self.reopen()
+        self.assertEqual(self.texts(), [("健身", False), ("a", True)])
+        self.assertEqual(self.texts(NEXT_DAY), [("健身", False)])
+
+    def test_batch_writes_once_on_exit(self):
+        with self.model.batch():
+            self.model.apply_ops([{"op": "add", "date": DAY, "text": str(n)} for n in range(3)])
+            self.assertEqual(ShardedTaskStore(os.path.join(self.dir, "months")).load(), {})
+        self.reopen()
+        self.assertEqual(self.texts(), [("0", False), ("1", False), ("2", False)])
+
+
+# --- 归档 ---
+class ArchiveTest(ModelTestCase):
+    def setUp(self):
+        super().setUp()
+        for key in (OLD_DAY, DAY):
+            for text in ("a", "b", "c"):
+                self.model.add(key, text)
+            self.model.toggle(key, self.model.day(key)[0]["id"])
+            self.model.toggle(key, self.model.day(key)[2]["id"])
+
+    def run_archive(self):
+        kept, count = self.model.archive_job(DAY)()
+        self.model.finish_archive(kept)
+        return kept, count
+
+    def test_moves_done_tasks_before_cutoff(self):
+        kept, count = self.run_archive()
+
+        self.assertEqual(count, 2)
+        self.assertEqual(list(kept), [OLD_DAY])
+        # 已读进内存的那天就地换成：归档部分在前，剩下的未完成任务在后
+        self.assertEqual(self.texts(OLD_DAY), [("a", True), ("c", True), ("b", False)])
+        self.assertTrue(all(t.get("archived") for t in self.model.day(OLD_DAY)[:2]))
+        self.assertEqual(self.texts(), [("a", True), ("b", False), ("c", True)])
+        self.assertEqual(self.model.archive.until(), DAY)
+        self.assertIsNone(self.model.undo())
+
+        self.reopen()
+        self.assertEqual(self.texts(OLD_DAY), [("a", True), ("c", True), ("b", False)])
+        self.assertEqual(self.model.month_stats(2025, 3), (3, 2))
+        self.assertEqual(self.run_archive(), ({}, 0))
+
+    def test_archived_tasks_are_read_only(self):
+        self.run_archive()
+        archived = self.model.day(OLD_DAY)[0]
+
+        self.assertIsNone(self.model.delete(OLD_DAY, archived["id"]))
+        self.assertIsNone(self.model.edit(OLD_DAY, archived["id"], "x"))
+        self.model.toggle(OLD_DAY, archived["id"])
+        self.assertEqual(self.texts(OLD_DAY), [("a", True), ("c", True), ("b", False)])
+
+    def test_rerun_after_interrupted_job_does_not_duplicate(self):
+        # 归档文件写好后、删掉在用数据前中断：下次重跑不能再追加一份
+        with mock.patch.object(self.model.store, "delete", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.model.archive_job(DAY)()
+        self.assertEqual(self.model.archive.until(), "0000-00-00")
+
+        self.reopen()
+        self.assertEqual(self.run_archive()[1], 2)
+        self.assertEqual([t["text"] for t in self.model.archive.day(OLD_DAY)], ["a", "c"])
+        self.assertEqual(self.texts(OLD_DAY), [("a", True), ("c", True), ("b", False)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+"""存储层的回归测试：旧单文件迁移、损坏文件回退、编号补全。全部在临时目录里进行。
+
+运行：python -m unittest discover -s Fcous/tests（或 python -m pytest Fcous/tests）
+"""
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from focus_storage import (JOURNAL_SUFFIX, ShardedTaskStore, SqliteTaskStore, ensure_ids,  # noqa: E402
+                           migrate_json_to_shards, migrate_json_to_sqlite, read_checked, write_json_atomic)
+
+LEGACY = {
+    "2026-09-30": [{"text": "写周报", "done": True}, {"text": "回邮件", "done": False}],
+    "2026-10-18": [{"text": "健身", "done": False}, {"text": "读书", "done": True}, {"text": "买菜", "done": False}],
+}
+
+
+class TempDirTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp(prefix="focus_test_")
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def path(self, *names):
+        return os.path.join(self.dir, *names)
+
+    def write_legacy(self, data):
+        path = self.path("todo_data.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+
+# --- 旧单文件迁移 ---
+class MigrateJsonToShardsTest(TempDirTestCase):
+    def test_splits_by_month_and_keeps_original_as_bak(self):
+        path = self.write_legacy(LEGACY)
+        with open(path, "rb") as f:
+            original = f.read()
+        shard_dir = self.path("months")
+
+        self.assertEqual(migrate_json_to_shards(path, shard_dir), 5)
+
+        self.assertEqual(sorted(os.listdir(shard_dir)), ["2026-09.json", "2026-10.json"])
+        expected = {k: ensure_ids([dict(t) for t in tasks]) for k, tasks in LEGACY.items()}
+        self.assertEqual(ShardedTaskStore(shard_dir).load(), expected)
+        self.assertFalse(os.path.exists(path))
+        with open(path + ".bak", "rb") as f:
+            self.assertEqual(f.read(), original)  # 留底的就是用户原来的文件，一个字节都没动
+
+    def test_replays_unmerged_journal(self):
+        path = self.write_legacy(LEGACY)
+        with open(path + JOURNAL_SUFFIX, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "toggle", "date": "2026-10-18", "idx": 0, "done": True, "seq": 1}) + "\n")
+        shard_dir = self.path("months")
+
+        migrate_json_to_shards(path, shard_dir)
+
+        self.assertTrue(ShardedTaskStore(shard_dir).load()["2026-10-18"][0]["done"])
+        self.assertTrue(os.path.exists(path + JOURNAL_SUFFIX + ".bak"))
+
+    def test_truncated_file_aborts_and_keeps_original(self):
+        path = self.write_legacy(LEGACY)
+        with open(path, "rb") as f:
+            original = f.read()
+        with open(path, "wb") as f:
+            f.write(original[:len(original) // 2])  # 写到一半断电
+        shard_dir = self.path("months")
+
+        with self.assertRaises(ValueError):
+            migrate_json_to_shards(path, shard_dir)
+
+        self.assertFalse(os.path.exists(shard_dir))
+        self.assertFalse(os.path.exists(path + ".bak"))
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), original[:len(original) // 2])
+
+
+class MigrateJsonToSqliteTest(TempDirTestCase):
+    def test_moves_into_database_and_retires_original(self):
+        path = self.write_legacy(LEGACY)
+        db_path = self.path("todo_data.db")
+
+        self.assertEqual(migrate_json_to_sqlite(path, db_path), 5)
+
+        store = SqliteTaskStore(db_path)
+        try:
+            self.assertEqual(store.load(), {k: ensure_ids([dict(t) for t in tasks]) for k, tasks in LEGACY.items()})
+        finally:
+            store.close()
+        # 搬完只剩数据库一份在用，旧文件改名 .bak
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(path + ".bak"))
+
+
+# --- 损坏文件回退 ---
+class ReadCheckedTest(TempDirTestCase):
+    def test_falls_back_to_previous_generation(self):
+        path = self.path("todo_config.json")
+        write_json_atomic(path, {"version": 1})
+        write_json_atomic(path, {"version": 2})
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) // 2)
+
+        self.assertEqual(read_checked(path), {"version": 1})
+
+        # 坏的那份改名 .corrupt 留着，不再参与轮换
+        self.assertFalse(os.path.exists(path))
+        self.assertTrue(os.path.exists(path + ".corrupt"))
+
+    def test_checksum_mismatch_counts_as_damaged(self):
+        path = self.path("todo_config.json")
+        write_json_atomic(path, {"text": "old"})
+        write_json_atomic(path, {"text": "new"})
+        with open(path, "rb") as f:
+            data = f.read()
+        with open(path, "wb") as f:
+            f.write(data.replace(b"new", b"bad"))  # JSON 仍然合法，只有校验和对不上
+
+        self.assertEqual(read_checked(path), {"text": "old"})
+        self.assertTrue(os.path.exists(path + ".corrupt"))
+
+    def test_all_generations_damaged_raises(self):
+        path = self.path("todo_config.json")
+        write_json_atomic(path, {"version": 1})
+        write_json_atomic(path, {"version": 2})
+        for candidate in (path, path + ".1"):
+            with open(candidate, "wb") as f:
+                f.write(b"{")
+
+        with self.assertRaises(ValueError):
+            read_checked(path)
+
+    def test_locked_file_is_not_treated_as_damaged(self):
+        path = self.path("todo_config.json")
+        write_json_atomic(path, {"version": 1})
+        write_json_atomic(path, {"version": 2})
+
+        # 杀毒软件或索引服务暂时锁住文件：报错给调用方，不能改名 .corrupt 再退回旧版
+        with mock.patch("builtins.open", side_effect=PermissionError(13, "locked")):
+            with self.assertRaises(PermissionError):
+                read_checked(path)
+
+        self.assertFalse(os.path.exists(path + ".corrupt"))
+        self.assertEqual(read_checked(path), {"version": 2})
+
+    def test_missing_file_returns_none(self):
+        self.assertIsNone(read_checked(self.path("nothing.json")))
+
+
+# --- 编号补全 ---
+class TaskIdBackfillTest(TempDirTestCase):
+    def test_ensure_ids_fills_after_existing(self):
+        tasks = [{"text": "a"}, {"text": "b", "id": 5}, {"text": "c"}]
+        self.assertEqual([t["id"] for t in ensure_ids(tasks)], [6, 5, 7])
+        self.assertEqual([t["id"] for t in ensure_ids(tasks)], [6, 5, 7])  # 已补过的不再变
+
+    def test_sqlite_backfill_matches_ensure_ids(self):
+        # 没有 tid 列的旧库：打开时按当天顺序补编号，结果要与 JSON 分片读入时补出的一样
+        db_path = self.path("todo_data.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE tasks (id INTEGER PRIMARY KEY, date TEXT NOT NULL, pos INTEGER NOT NULL, "
+                     "text TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0, extra TEXT)")
+        with conn:
+            conn.executemany("INSERT INTO tasks (date, pos, text, done) VALUES (?, ?, ?, ?)",
+                             [(k, pos, t["text"], int(t["done"]))
+                              for k, tasks in reversed(list(LEGACY.items())) for pos, t in enumerate(tasks)])
+        conn.close()
+
+        store = SqliteTaskStore(db_path)
+        try:
+            from_sqlite = store.load()
+        finally:
+            store.close()
+        from_json = {k: ensure_ids([dict(t) for t in tasks]) for k, tasks in LEGACY.items()}
+        self.assertEqual(from_sqlite, from_json)
+
+
+if __name__ == "__main__":
+    unittest.main()